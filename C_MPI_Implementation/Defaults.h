@@ -12,10 +12,12 @@ Updated 2010, Tiago Sommer Damasceno and
 #define BCCD_LIFE_DEFAULTS_H
 
 #include <stddef.h>
+#include <stdio.h>
 #include <stdbool.h>
+#include <stdint.h>
 #include <getopt.h>
 
-static const char * opts = "c:r:g:i:o:t::xh?";
+static const char * opts = "c:r:g:i:o:t::T:A:OD:zB:aK:j:bxh?";
 static const struct option long_opts[] = {
 	{ "columns", required_argument, NULL, 'c' },
 	{ "rows", required_argument, NULL, 'r' },
@@ -23,6 +25,16 @@ static const struct option long_opts[] = {
 	{ "output", required_argument, NULL, 'o' },
 	{ "input", required_argument, NULL, 'i' },
 	{ "throttle", optional_argument, NULL, 't' },
+	{ "tile", required_argument, NULL, 'T' },
+	{ "active-log", required_argument, NULL, 'A' },
+	{ "overlap", no_argument, NULL, 'O' },
+	{ "depth", required_argument, NULL, 'D' },
+	{ "compress", no_argument, NULL, 'z' },
+	{ "balance", required_argument, NULL, 'B' },
+	{ "age", no_argument, NULL, 'a' },
+	{ "kernel", required_argument, NULL, 'K' },
+	{ "threads", required_argument, NULL, 'j' },
+	{ "blocks", no_argument, NULL, 'b' },
 	{ "help", no_argument, NULL, 'h' },
 	{ NULL, no_argument, NULL, 0 }
 };
@@ -32,6 +44,10 @@ const int DEFAULT_THROTTLE = 60;
 const int     DEFAULT_SIZE = 105;
 const int     DEFAULT_GENS = 1000;
 const double     INIT_PROB = 0.25;
+const int     DEFAULT_TILE = 0;    // 0 evaluates every cell every generation
+const int    DEFAULT_DEPTH = 1;    // ghost columns, exchanged every depth generations
+const int  DEFAULT_BALANCE = 0;    // generations between rebalances, 0 for never
+const int  DEFAULT_THREADS = 1;    // OpenMP threads for each process
 
 // All the data needed by an instance of Life
 struct life_t {
@@ -39,18 +55,89 @@ struct life_t {
 	int  size;
 	int  ncols;
 	int  nrows;
-	int  ** grid;
-	int  ** next_grid;
+	uint8_t ** grid;      // grid[i] is column i, see alloc_cells()
+	uint8_t ** next_grid;
 	int  generations;
 	char * infile;
 	char * outfile;
+
+	// Active tile tracking, only used when tile > 0
+	int    tile;        // length of side of a tile in cells
+	int    ntx;         // tiles across the columns
+	int    nty;         // tiles down the rows
+	bool * active;      // tiles to evaluate this generation
+	bool * changed;     // tiles with a cell that changed this generation
+	int  * bounds;      // ghost columns seen last generation
+	long   active_sum;  // active tiles summed over all generations
+	long   tile_sum;    // tiles summed over all generations
+	int    gen;         // generations evaluated so far
+	char * activefile;  // per generation active tile fraction, rank 0 only
+	FILE * activefd;
+
+	// Overlapping the side exchange with evaluation, see eval_overlap()
+	bool   overlap;
+	double t_inner;     // evaluating inner columns, exchange in flight
+	double t_wait;      // waiting for the exchange to finish
+	double t_edge;      // evaluating the two edge columns
+
+	// Deep ghost zones, see eval_deep(). grid[1-depth] to grid[0] and
+	// grid[ncols+1] to grid[ncols+depth] are ghost columns
+	int    depth;
+
+	// Sides sent as bits, see sendrecv_sides()
+	bool   compress;
+	unsigned char * bits; // 4 blocks of (depth*(nrows+2)+7)/8 bytes
+
+	// Moving columns between processes, see rebalance()
+	int    balance;     // generations between rebalances, 0 for never
+	double t_work;      // evaluating since the last rebalance
+
+	// Ages of the cells, only kept with --age, see age_cells()
+	bool   track_age;
+	int ** age;
+
+	// How neighbours are counted, see eval_sums()
+	int    kernel;
+	uint8_t * sums;     // 3 columns of nrows+2 running sums a thread
+
+	int    threads;     // OpenMP threads evaluating the columns
+
+	// Layout of the processes, see init_blocks()
+	bool     blocks;        // a 2D grid of blocks rather than a row
+	int      dims[2];       // processes across the columns and the rows
+	int      nbr[3][3];     // rank of the neighbour dx, dy away at [dx+1][dy+1]
+	MPI_Comm cart;
+	MPI_Datatype row_type;  // ncols cells of a row, strided through the grid
+	int      coords[2];     // of this process's block in the grid of them
+
+	// Where the block is in the world, see init_grids()
+	int  world_cols;
+	int  world_rows;
+	int  col0;          // world column of column 1, counting from 0
+	int  row0;          // world row of row 1, counting from 0
+};
+
+// Head of an --output file, followed by every cell of the world column
+// after column, see write_grid()
+struct life_header {
+	char    magic[4];     // FILE_MAGIC
+	int32_t ncols;
+	int32_t nrows;
+	int32_t cell_bytes;   // 1 for the cells, 4 for their ages with --age
 };
 
+const char FILE_MAGIC[] = "LIFE";
+
 enum CELL_STATES {
 	DEAD = 0,
 	ALIVE
 };
 
+enum KERNELS {
+	KERNEL_RULES = 0,   // eval_columns(), each neighbour looked at
+	KERNEL_SUMS         // eval_sums(), running sums of 3 cells
+};
+
 // Cells become DEAD with more than UPPER_THRESH 
 // or fewer than LOWER_THRESH neighbors
 const int UPPER_THRESH = 3;
@@ -23,21 +23,50 @@ more detailed information.
 int main(int argc, char ** argv) {
 
 	int count;
+	int steps;
+	double t_step,t_wait;
 	struct life_t life;
 	clock_t t;
 
 	init(&life, &argc, &argv);
-	float time0 = clock();	
+	// wall clock time, clock() would add up the time of every thread
+	double time0 = MPI_Wtime();
 	for (count = 0; count < life.generations; count++) {
 
-		copy_bounds(&life);
+		if (life.depth > 1) {
+			// several generations for each exchange
+			steps = life.generations - count;
+			if (steps > life.depth)
+				steps = life.depth;
+			eval_deep(&life, steps);
+			count += steps - 1;
+			continue;
+		}
 
-		eval_rules(&life);
+		t_step = MPI_Wtime();
+		t_wait = life.t_wait;
+		if (life.overlap) {
+			eval_overlap(&life);
+		} else {
+			copy_bounds(&life);
+			// waiting for the sides isn't this process's work
+			t_step = MPI_Wtime();
+
+			if (life.tile > 0)
+				eval_tiles(&life);
+			else
+				eval_rules(&life);
+		}
 
 		update_grid(&life);
+		life.t_work += MPI_Wtime() - t_step - (life.t_wait - t_wait);
+
+		if (life.balance > 0 && (count+1) % life.balance == 0 &&
+				count+1 < life.generations && life.size > 1)
+			rebalance(&life, count+1);
 	}
-	double time1 = clock();	
-	printf("%f\n",(time1-time0)/CLOCKS_PER_SEC);
+	double time1 = MPI_Wtime();
+	printf("%f\n",time1-time0);
 	cleanup(&life);
 	exit(EXIT_SUCCESS);
 }
@@ -20,16 +20,55 @@ Updated Summer 2010, Tiago Sommer Damasceno and
 #include <stdbool.h>  // For true/false
 #include <getopt.h>   // For argument processing
 #include <stdio.h>    // For file i/o
+#include <stdint.h>   // For uint8_t
+#include <string.h>   // For memcpy
+
+#ifdef _OPENMP
+#include <omp.h>      // For --threads
+#else
+#define omp_set_num_threads(n)
+#define omp_get_num_threads() 1
+#define omp_get_thread_num()  0
+#endif
 
 
 int               init (struct life_t * life, int * c, char *** v);
 void        eval_rules (struct life_t * life);
+void      eval_columns (struct life_t * life, int i0, int i1);
+void        eval_block (struct life_t * life, int i0, int i1, int j0,
+                        int j1);
+bool         eval_sums (struct life_t * life, int i0, int i1, int j0,
+                        int j1);
+void      eval_overlap (struct life_t * life);
+void         eval_deep (struct life_t * life, int steps);
+void         rebalance (struct life_t * life, int gen);
+void      move_columns (struct life_t * life, int left, int right);
+void        eval_tiles (struct life_t * life);
 void       copy_bounds (struct life_t * life);
+void      init_blocks (struct life_t * life);
+void   exchange_blocks (struct life_t * life, MPI_Request * reqs);
+void    overlap_blocks (struct life_t * life);
+void    sendrecv_sides (struct life_t * life, uint8_t * to_left,
+                        uint8_t * to_right, uint8_t * from_left,
+                        uint8_t * from_right, int n);
+void         pack_bits (uint8_t * cells, int n, unsigned char * bits);
+void       unpack_bits (unsigned char * bits, int n, uint8_t * cells);
 void       update_grid (struct life_t * life);
+void         age_cells (struct life_t * life);
+void      update_tiles (struct life_t * life);
 void    allocate_grids (struct life_t * life);
+uint8_t **   alloc_cells (int ncols, int nrows, int depth);
+void    allocate_tiles (struct life_t * life);
+void       reset_tiles (struct life_t * life);
 void        init_grids (struct life_t * life);
+int        read_header (struct life_t * life, FILE ** fd);
+void     scatter_cells (struct life_t * life, FILE * fd);
+void        read_cells (struct life_t * life, int cell_bytes);
 void        write_grid (struct life_t * life);
 void        free_grids (struct life_t * life);
+void        free_tiles (struct life_t * life);
+void      report_tiles (struct life_t * life);
+void    report_overlap (struct life_t * life);
 double     rand_double ();
 void    randomize_grid (struct life_t * life, double prob);
 void       seed_random (int rank);
@@ -44,6 +83,7 @@ void             usage ();
 int init (struct life_t * life, int * c, char *** v) {
 	int argc          = *c;
 	char ** argv      = *v;
+	int provided;
 	life->rank        = 0;
 	life->size        = 1;
 	life->ncols       = DEFAULT_SIZE;
@@ -51,8 +91,27 @@ int init (struct life_t * life, int * c, char *** v) {
 	life->generations = DEFAULT_GENS;
 	life->infile      = NULL;
 	life->outfile     = NULL;
+	life->tile        = DEFAULT_TILE;
+	life->activefile  = NULL;
+	life->activefd    = NULL;
+	life->overlap     = false;
+	life->t_inner     = 0;
+	life->t_wait      = 0;
+	life->t_edge      = 0;
+	life->depth       = DEFAULT_DEPTH;
+	life->age         = NULL;
+	life->track_age   = false;
+	life->kernel      = KERNEL_RULES;
+	life->sums        = NULL;
+	life->compress    = false;
+	life->bits        = NULL;
+	life->balance     = DEFAULT_BALANCE;
+	life->t_work      = 0;
+	life->threads     = DEFAULT_THREADS;
+	life->blocks      = false;
 
-	MPI_Init(&argc, &argv);
+	// only the main thread calls MPI, the threads just evaluate
+	MPI_Init_thread(&argc, &argv, MPI_THREAD_FUNNELED, &provided);
 	MPI_Comm_rank(MPI_COMM_WORLD, &life->rank);
 	MPI_Comm_size(MPI_COMM_WORLD, &life->size);
 
@@ -60,8 +119,29 @@ int init (struct life_t * life, int * c, char *** v) {
 
 	parse_args(life, argc, argv);
 
+	omp_set_num_threads(life->threads);
+
+	init_blocks(life);
 	init_grids(life);
 
+	if (life->depth > life->ncols) {
+		printf("--depth can't be more than the number of columns.\nExiting.\n");
+		exit(EXIT_FAILURE);
+	}
+	if (life->compress)
+		life->bits = (unsigned char *) malloc(4 *
+			((life->depth*(life->nrows+2)+7)/8));
+	if (life->kernel == KERNEL_SUMS)
+		life->sums = (uint8_t *) malloc(3 * (life->nrows+2) *
+			life->threads);
+
+	if (life->tile > 0)
+		allocate_tiles(life);
+
+	// a row of the block, strided through the columns in memory
+	MPI_Type_vector(life->ncols, 1, life->nrows+2, MPI_UNSIGNED_CHAR,
+		&life->row_type);
+	MPI_Type_commit(&life->row_type);
 }
 
 /*
@@ -70,16 +150,38 @@ int init (struct life_t * life, int * c, char *** v) {
 		neighbors and update current state accordingly.
 */
 void eval_rules (struct life_t * life) {
+	eval_columns(life, 1, life->ncols);
+}
+
+/*
+	eval_columns()
+		eval_rules() for columns i0 to i1 only.
+*/
+void eval_columns (struct life_t * life, int i0, int i1) {
+	eval_block(life, i0, i1, 1, life->nrows);
+}
+
+/*
+	eval_block()
+		eval_rules() for rows j0 to j1 of columns i0 to i1 only.
+*/
+void eval_block (struct life_t * life, int i0, int i1, int j0, int j1) {
 	int i,j,k,l,neighbors;
 
-	int ncols = life->ncols;
-	int nrows = life->nrows;
+	uint8_t ** grid      = life->grid;
+	uint8_t ** next_grid = life->next_grid;
 
-	int ** grid      = life->grid;
-	int ** next_grid = life->next_grid;
+	if (i0 > i1 || j0 > j1)
+		return;
 
-	for (i = 1; i <= ncols; i++) {
-		for (j = 1; j <= nrows; j++) {
+	if (life->kernel == KERNEL_SUMS) {
+		eval_sums(life, i0, i1, j0, j1);
+		return;
+	}
+
+	#pragma omp parallel for private(j,k,l,neighbors)
+	for (i = i0; i <= i1; i++) {
+		for (j = j0; j <= j1; j++) {
 			neighbors = 0;
 
 			// count neighbors
@@ -90,15 +192,246 @@ void eval_rules (struct life_t * life) {
 				}
 			}
 
-			// update state
+			// update state, every cell as next_grid holds the
+			// generation before last
 			if (neighbors < LOWER_THRESH || neighbors > UPPER_THRESH)
 				next_grid[i][j] = DEAD;
 			else if (grid[i][j] != DEAD || neighbors == SPAWN_THRESH)
-				next_grid[i][j] = grid[i][j]+1;
+				next_grid[i][j] = ALIVE;
+			else
+				next_grid[i][j] = DEAD;
 		}
 	}
+}// END eval_block()
+
+/*
+	column_sums()
+		sums[j] = col[j-1] + col[j] + col[j+1] for rows j0 to j1.
+*/
+static void column_sums (const uint8_t * restrict col,
+		uint8_t * restrict sums, int j0, int j1) {
+	int j;
+
+	for (j = j0; j <= j1; j++)
+		sums[j] = col[j-1] + col[j] + col[j+1];
+}
+
+/*
+	apply_rules()
+		Works out rows j0 to j1 of one column from the sums of 3
+		cells of the columns either side and of its own. The sum of
+		all 9 cells less the cell itself is its neighbour count, and
+		the rules are comparisons of it ANDed and ORed together, so
+		there are no branches and the compiler can vectorise the
+		loop (NEON on the Pi). Returns whether a cell changed.
+*/
+static bool apply_rules (const uint8_t * restrict left,
+		const uint8_t * restrict mid, const uint8_t * restrict right,
+		const uint8_t * restrict cell, uint8_t * restrict next,
+		int j0, int j1) {
+	int j;
+	uint8_t n;
+	uint8_t changed = 0;
+
+	for (j = j0; j <= j1; j++) {
+		n = left[j] + mid[j] + right[j] - cell[j];
+		next[j] = ((n >= LOWER_THRESH) & (n <= UPPER_THRESH) & cell[j]) |
+			(n == SPAWN_THRESH);
+		changed |= next[j] ^ cell[j];
+	}
+
+	return changed != 0;
+}
+
+/*
+	sum_columns()
+		The sums of 3 cells down each column are worked out once
+		and a window of 3 of them slides across the columns, about
+		3 adds a cell rather than 8 loads and branches. Cells are 0
+		or 1, so the sums fit a byte. sums holds 3 columns of them
+		and must be the calling thread's own.
+*/
+static bool sum_columns (struct life_t * life, uint8_t * sums, int i0,
+		int i1, int j0, int j1) {
+	int i;
+	bool changed = false;
+
+	uint8_t ** grid      = life->grid;
+	uint8_t ** next_grid = life->next_grid;
+
+	// the sums of the columns left of, at and right of column i
+	uint8_t * left  = sums;
+	uint8_t * mid   = sums + (life->nrows+2);
+	uint8_t * right = sums + 2*(life->nrows+2);
+	uint8_t * swap;
+
+	column_sums(grid[i0-1], left, j0, j1);
+	column_sums(grid[i0], mid, j0, j1);
+
+	for (i = i0; i <= i1; i++) {
+		column_sums(grid[i+1], right, j0, j1);
+		if (apply_rules(left, mid, right, grid[i], next_grid[i], j0, j1))
+			changed = true;
+
+		swap  = left;
+		left  = mid;
+		mid   = right;
+		right = swap;
+	}
+
+	return changed;
+}// END sum_columns()
+
+/*
+	eval_sums()
+		eval_columns() for rows j0 to j1 of columns i0 to i1, but
+		counting neighbours from running sums, see sum_columns().
+		With --threads each thread takes a run of the columns.
+		Returns whether a cell changed.
+*/
+bool eval_sums (struct life_t * life, int i0, int i1, int j0, int j1) {
+	int changed = 0;
+
+	#pragma omp parallel reduction(|:changed)
+	{
+		int t  = omp_get_thread_num();
+		int n  = omp_get_num_threads();
+		int c0 = i0 + (i1-i0+1) * t / n;
+		int c1 = i0 + (i1-i0+1) * (t+1) / n - 1;
+
+		if (c0 <= c1)
+			changed |= sum_columns(life, life->sums + 3*(life->nrows+2)*t,
+				c0, c1, j0, j1);
+	}
+
+	return changed != 0;
+}// END eval_sums()
+
+/*
+	mark_tile()
+		Marks the tile at (tx, ty) and the eight around it
+		active, wrapping at the edges like the grid does.
+*/
+static void mark_tile (struct life_t * life, bool * flags, int tx, int ty) {
+	int x,y;
+	int ntx = life->ntx;
+	int nty = life->nty;
+
+	for (x = tx-1; x <= tx+1; x++)
+		for (y = ty-1; y <= ty+1; y++)
+			flags[((x+ntx) % ntx)*nty + (y+nty) % nty] = true;
 }
 
+/*
+	eval_tiles()
+		Same rules as eval_rules(), but only for the tiles that
+		are active this generation. A tile is active if a cell in
+		it or one of the eight tiles around it changed state last
+		generation, or if a ghost cell next to it changed. Records
+		which tiles changed for update_tiles(). A tile that isn't
+		active is the same in both grids, so swapping them in
+		update_grid() leaves it right. With --threads the tiles
+		are shared out between the threads as they come free.
+*/
+void eval_tiles (struct life_t * life) {
+	int i,j,k,l,tx,ty,neighbors;
+	int i0,i1,j0,j1;
+	long active_sum = 0;
+	bool left,right;
+
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+	int tile  = life->tile;
+	int ntx   = life->ntx;
+	int nty   = life->nty;
+
+	uint8_t ** grid      = life->grid;
+	uint8_t ** next_grid = life->next_grid;
+	int *  bounds    = life->bounds;
+	int *  rows      = life->bounds + 2*(nrows+2);
+	bool * active    = life->active;
+	bool * changed   = life->changed;
+	bool   top,bottom;
+
+	// The ghost columns come from the neighbouring processes, so a
+	// change there wakes the tiles along that edge
+	for (j = 0; j < nrows+2; j++) {
+		left  = grid[0][j] != DEAD;
+		right = grid[ncols+1][j] != DEAD;
+		ty = (j == 0) ? 0 : (j > nrows) ? nty-1 : (j-1) / tile;
+		if (left != bounds[j])
+			mark_tile(life, active, 0, ty);
+		if (right != bounds[nrows+2+j])
+			mark_tile(life, active, ntx-1, ty);
+		bounds[j]         = left;
+		bounds[nrows+2+j] = right;
+	}
+
+	// and with --blocks so do the ghost rows, the corners are in the
+	// ghost columns
+	for (i = 1; life->blocks && i <= ncols; i++) {
+		bottom = grid[i][0] != DEAD;
+		top    = grid[i][nrows+1] != DEAD;
+		tx = (i-1) / tile;
+		if (bottom != rows[i])
+			mark_tile(life, active, tx, 0);
+		if (top != rows[ncols+2+i])
+			mark_tile(life, active, tx, nty-1);
+		rows[i]         = bottom;
+		rows[ncols+2+i] = top;
+	}
+
+	#pragma omp parallel for collapse(2) schedule(dynamic) \
+		private(i,j,k,l,neighbors,i0,i1,j0,j1) reduction(+:active_sum)
+	for (tx = 0; tx < ntx; tx++) {
+		for (ty = 0; ty < nty; ty++) {
+			changed[tx*nty+ty] = false;
+			if (!active[tx*nty+ty])
+				continue;
+
+			active_sum++;
+
+			i0 = tx*tile + 1;
+			i1 = (tx+1)*tile < ncols ? (tx+1)*tile : ncols;
+			j0 = ty*tile + 1;
+			j1 = (ty+1)*tile < nrows ? (ty+1)*tile : nrows;
+
+			if (life->kernel == KERNEL_SUMS) {
+				changed[tx*nty+ty] = sum_columns(life, life->sums +
+					3*(nrows+2)*omp_get_thread_num(), i0, i1, j0, j1);
+				continue;
+			}
+
+			for (i = i0; i <= i1; i++) {
+				for (j = j0; j <= j1; j++) {
+					neighbors = 0;
+
+					// count neighbors
+					for (k = i-1; k <= i+1; k++) {
+						for (l = j-1; l <= j+1; l++) {
+							if (!(k == i && l == j) && grid[k][l] != DEAD)
+								neighbors++;
+						}
+					}
+
+					// update state
+					if (neighbors < LOWER_THRESH || neighbors > UPPER_THRESH)
+						next_grid[i][j] = DEAD;
+					else if (grid[i][j] != DEAD || neighbors == SPAWN_THRESH)
+						next_grid[i][j] = ALIVE;
+					else
+						next_grid[i][j] = DEAD;
+
+					if (next_grid[i][j] != grid[i][j])
+						changed[tx*nty+ty] = true;
+				}
+			}
+		}
+	}
+
+	life->active_sum += active_sum;
+}// END eval_tiles()
+
 /*
 	copy_bounds()
 		Copies sides, top, and bottom to their respective locations.
@@ -107,37 +440,32 @@ void eval_rules (struct life_t * life) {
 		In the MPI model, processes are aligned side-by-side.
 		Left and right sides are sent to neighboring processes.
 		Top and bottom are copied from the process's own grid.
+		With --blocks everything comes from the neighbours, see
+		exchange_blocks().
 */
 void copy_bounds (struct life_t * life) {
 	int i,j;
 
-	int rank  = life->rank;
 	int size  = life->size;
 	int ncols = life->ncols;
 	int nrows = life->nrows;
 
-	int ** grid = life->grid;
+	uint8_t ** grid = life->grid;
 
-	MPI_Status status;
-	int left_rank  = (rank-1+size) % size;
-	int right_rank = (rank+1) % size;
+	MPI_Request reqs[16];
 
-	enum TAGS {
-		TOLEFT,
-		TORIGHT
-	};
+	if (life->blocks) {
+		exchange_blocks(life, reqs);
+		MPI_Waitall(16, reqs, MPI_STATUSES_IGNORE);
+		return;
+	}
 
 	//	Some MPIs deadlock if a single process tries 
 	//to communicate with itself
 	if (size != 1) {
 		// copy sides to neighboring processes
-		MPI_Sendrecv(grid[1], nrows+2, MPI_INT, left_rank, TOLEFT,
-			grid[ncols+1], nrows+2, MPI_INT, right_rank, TOLEFT,
-			MPI_COMM_WORLD, &status);
-
-		MPI_Sendrecv(grid[ncols], nrows+2, MPI_INT, right_rank,
-			TORIGHT, grid[0], nrows+2, MPI_INT, left_rank,
-			TORIGHT, MPI_COMM_WORLD, &status);
+		sendrecv_sides(life, grid[1], grid[ncols], grid[0], grid[ncols+1],
+			nrows+2);
 	}
 
 	// Copy sides locally to maintain periodic boundaries
@@ -156,117 +484,1046 @@ void copy_bounds (struct life_t * life) {
 	grid[ncols+1][nrows+1] = grid[ncols+1][1];
 
 	// copy top and bottom
+	#pragma omp parallel for
 	for (i = 1; i <= ncols; i++) {
 		grid[i][0]       = grid[i][nrows];
 		grid[i][nrows+1] = grid[i][1];
 	}
 }// END copy_bounds()
 
+/*
+	sendrecv_sides()
+		Sends n cells to each neighbour and receives n from each,
+		to_left going to the left and from_right coming from the
+		right, then the other way. With --compress the cells are
+		sent as bits, 8 times fewer bytes than as bytes.
+*/
+void sendrecv_sides (struct life_t * life, uint8_t * to_left,
+		uint8_t * to_right, uint8_t * from_left, uint8_t * from_right,
+		int n) {
+	int rank  = life->rank;
+	int size  = life->size;
+	int bytes = (n+7)/8;
+
+	unsigned char * bits = life->bits;
+
+	MPI_Status status;
+	int left_rank  = (rank-1+size) % size;
+	int right_rank = (rank+1) % size;
+
+	enum TAGS {
+		TOLEFT,
+		TORIGHT
+	};
+
+	if (!life->compress) {
+		MPI_Sendrecv(to_left, n, MPI_UNSIGNED_CHAR, left_rank, TOLEFT,
+			from_right, n, MPI_UNSIGNED_CHAR, right_rank, TOLEFT,
+			MPI_COMM_WORLD, &status);
+
+		MPI_Sendrecv(to_right, n, MPI_UNSIGNED_CHAR, right_rank, TORIGHT,
+			from_left, n, MPI_UNSIGNED_CHAR, left_rank, TORIGHT,
+			MPI_COMM_WORLD, &status);
+		return;
+	}
+
+	pack_bits(to_left, n, bits);
+	pack_bits(to_right, n, bits + bytes);
+	MPI_Sendrecv(bits, bytes, MPI_UNSIGNED_CHAR, left_rank, TOLEFT,
+		bits + 2*bytes, bytes, MPI_UNSIGNED_CHAR, right_rank, TOLEFT,
+		MPI_COMM_WORLD, &status);
+
+	MPI_Sendrecv(bits + bytes, bytes, MPI_UNSIGNED_CHAR, right_rank, TORIGHT,
+		bits + 3*bytes, bytes, MPI_UNSIGNED_CHAR, left_rank, TORIGHT,
+		MPI_COMM_WORLD, &status);
+	unpack_bits(bits + 2*bytes, n, from_right);
+	unpack_bits(bits + 3*bytes, n, from_left);
+}// END sendrecv_sides()
+
+/*
+	pack_bits()
+		Packs n cells into (n+7)/8 bytes, cell j in bit j%8 of
+		byte j/8.
+*/
+void pack_bits (uint8_t * cells, int n, unsigned char * bits) {
+	int j;
+
+	for (j = 0; j < (n+7)/8; j++)
+		bits[j] = 0;
+	for (j = 0; j < n; j++)
+		if (cells[j] != DEAD)
+			bits[j/8] |= 1 << (j%8);
+}// END pack_bits()
+
+/*
+	unpack_bits()
+		The reverse of pack_bits().
+*/
+void unpack_bits (unsigned char * bits, int n, uint8_t * cells) {
+	int j;
+
+	for (j = 0; j < n; j++)
+		cells[j] = (bits[j/8] >> (j%8)) & 1 ? ALIVE : DEAD;
+}// END unpack_bits()
+
+/*
+	init_blocks()
+		Lays the processes out as a periodic 2D grid, as near
+		square as their number allows with --blocks, otherwise in
+		a row, and finds the neighbours. The world is shared out
+		between the blocks by init_grids().
+*/
+void init_blocks (struct life_t * life) {
+	int dx,dy;
+	int * coords = life->coords;
+	int periods[2] = { 1, 1 };
+
+	life->dims[0] = life->blocks ? 0 : life->size;
+	life->dims[1] = life->blocks ? 0 : 1;
+	MPI_Dims_create(life->size, 2, life->dims);
+
+	// the ranks keep their order, so run.py's placement holds
+	MPI_Cart_create(MPI_COMM_WORLD, 2, life->dims, periods, 0, &life->cart);
+	MPI_Cart_coords(life->cart, life->rank, 2, coords);
+
+	for (dx = -1; dx <= 1; dx++) {
+		for (dy = -1; dy <= 1; dy++) {
+			int nbr[2] = { coords[0]+dx, coords[1]+dy };
+			MPI_Cart_rank(life->cart, nbr, &life->nbr[dx+1][dy+1]);
+		}
+	}
+}// END init_blocks()
+
+/*
+	block_strip()
+		Where the cells on side (dx, dy) of the block are, the
+		ghost cells or the border cells next to them: a column,
+		a row or a corner cell.
+*/
+static void block_strip (struct life_t * life, int dx, int dy, bool ghost,
+		uint8_t ** cells, int * count, MPI_Datatype * type) {
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+
+	int i = dx < 0 ? (ghost ? 0 : 1) : dx > 0 ? (ghost ? ncols+1 : ncols) : 1;
+	int j = dy < 0 ? (ghost ? 0 : 1) : dy > 0 ? (ghost ? nrows+1 : nrows) : 1;
+
+	*cells = &life->grid[i][j];
+	*count = 1;
+	*type  = MPI_UNSIGNED_CHAR;
+
+	if (dy == 0)
+		*count = nrows;
+	else if (dx == 0)
+		*type = life->row_type;
+}
+
+/*
+	exchange_blocks()
+		Posts the receives of all 8 ghost strips of the block,
+		the sides, top and bottom and the 4 corner cells, and the
+		sends of the border strips to the 8 neighbours, 16
+		requests in reqs to wait for. Everything is sent straight
+		from the grid and received into it. A message is tagged
+		with the direction it travels in, so they can't cross when
+		a neighbour is the same process on two sides.
+*/
+void exchange_blocks (struct life_t * life, MPI_Request * reqs) {
+	int dx,dy,count;
+	int n = 0;
+	uint8_t * cells;
+	MPI_Datatype type;
+
+	for (dx = -1; dx <= 1; dx++) {
+		for (dy = -1; dy <= 1; dy++) {
+			if (dx == 0 && dy == 0)
+				continue;
+
+			// the border on side (dx, dy) goes that way, into the ghost
+			// on the far side of that neighbour
+			block_strip(life, -dx, -dy, true, &cells, &count, &type);
+			MPI_Irecv(cells, count, type, life->nbr[1-dx][1-dy],
+				(dx+1)*3 + dy+1, life->cart, &reqs[n++]);
+			block_strip(life, dx, dy, false, &cells, &count, &type);
+			MPI_Isend(cells, count, type, life->nbr[dx+1][dy+1],
+				(dx+1)*3 + dy+1, life->cart, &reqs[n++]);
+		}
+	}
+}// END exchange_blocks()
+
+/*
+	overlap_blocks()
+		eval_overlap() for --blocks. The cells that don't touch a
+		ghost, rows 2 to nrows-1 of columns 2 to ncols-1, are
+		evaluated while all 8 strips are in flight, then the rim
+		round them once they have arrived.
+*/
+void overlap_blocks (struct life_t * life) {
+	double t0,t1,t2,t3;
+
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+
+	MPI_Request reqs[16];
+
+	t0 = MPI_Wtime();
+	exchange_blocks(life, reqs);
+	eval_block(life, 2, ncols-1, 2, nrows-1);
+	t1 = MPI_Wtime();
+
+	MPI_Waitall(16, reqs, MPI_STATUSES_IGNORE);
+	t2 = MPI_Wtime();
+
+	eval_columns(life, 1, 1);
+	if (ncols > 1)
+		eval_columns(life, ncols, ncols);
+	eval_block(life, 2, ncols-1, 1, 1);
+	if (nrows > 1)
+		eval_block(life, 2, ncols-1, nrows, nrows);
+	t3 = MPI_Wtime();
+
+	life->t_inner += t1 - t0;
+	life->t_wait  += t2 - t1;
+	life->t_edge  += t3 - t2;
+}// END overlap_blocks()
+
+/*
+	eval_overlap()
+		copy_bounds() and eval_rules() in one, hiding the exchange
+		of the sides behind the evaluation of the columns that
+		don't need them. The sides are posted with non-blocking
+		sends and receives, columns 2 to ncols-1 are evaluated
+		while they are in flight, then columns 1 and ncols once
+		they have arrived. The time spent in each phase is added
+		up for report_overlap().
+*/
+void eval_overlap (struct life_t * life) {
+	int i,j;
+	double t0,t1,t2,t3;
+
+	int rank  = life->rank;
+	int size  = life->size;
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+
+	uint8_t ** grid = life->grid;
+	int bytes = (nrows+2+7)/8;
+
+	unsigned char * bits = life->bits;
+
+	MPI_Request reqs[4];
+	int left_rank  = (rank-1+size) % size;
+	int right_rank = (rank+1) % size;
+
+	enum TAGS {
+		TOLEFT,
+		TORIGHT
+	};
+
+	if (life->blocks) {
+		overlap_blocks(life);
+		return;
+	}
+
+	// top and bottom only need this process's own columns
+	#pragma omp parallel for
+	for (i = 1; i <= ncols; i++) {
+		grid[i][0]       = grid[i][nrows];
+		grid[i][nrows+1] = grid[i][1];
+	}
+
+	t0 = MPI_Wtime();
+	if (size != 1 && life->compress) {
+		MPI_Irecv(bits + 2*bytes, bytes, MPI_UNSIGNED_CHAR, right_rank,
+			TOLEFT, MPI_COMM_WORLD, &reqs[0]);
+		MPI_Irecv(bits + 3*bytes, bytes, MPI_UNSIGNED_CHAR, left_rank,
+			TORIGHT, MPI_COMM_WORLD, &reqs[1]);
+		pack_bits(grid[1], nrows+2, bits);
+		pack_bits(grid[ncols], nrows+2, bits + bytes);
+		MPI_Isend(bits, bytes, MPI_UNSIGNED_CHAR, left_rank, TOLEFT,
+			MPI_COMM_WORLD, &reqs[2]);
+		MPI_Isend(bits + bytes, bytes, MPI_UNSIGNED_CHAR, right_rank,
+			TORIGHT, MPI_COMM_WORLD, &reqs[3]);
+	} else if (size != 1) {
+		MPI_Irecv(grid[ncols+1], nrows+2, MPI_UNSIGNED_CHAR, right_rank,
+			TOLEFT, MPI_COMM_WORLD, &reqs[0]);
+		MPI_Irecv(grid[0], nrows+2, MPI_UNSIGNED_CHAR, left_rank,
+			TORIGHT, MPI_COMM_WORLD, &reqs[1]);
+		MPI_Isend(grid[1], nrows+2, MPI_UNSIGNED_CHAR, left_rank,
+			TOLEFT, MPI_COMM_WORLD, &reqs[2]);
+		MPI_Isend(grid[ncols], nrows+2, MPI_UNSIGNED_CHAR, right_rank,
+			TORIGHT, MPI_COMM_WORLD, &reqs[3]);
+	} else {
+		for (j = 0; j < nrows+2; j++) {
+			grid[ncols+1][j] = grid[1][j];
+			grid[0][j] = grid[ncols][j];
+		}
+	}
+
+	// columns 2 to ncols-1 never look at the sides
+	eval_columns(life, 2, ncols-1);
+	t1 = MPI_Wtime();
+
+	if (size != 1)
+		MPI_Waitall(4, reqs, MPI_STATUSES_IGNORE);
+	if (size != 1 && life->compress) {
+		unpack_bits(bits + 2*bytes, nrows+2, grid[ncols+1]);
+		unpack_bits(bits + 3*bytes, nrows+2, grid[0]);
+	}
+	t2 = MPI_Wtime();
+
+	// copy corners
+	grid[0][0]             = grid[0][nrows];
+	grid[0][nrows+1]       = grid[0][1];
+	grid[ncols+1][0]       = grid[ncols+1][nrows];
+	grid[ncols+1][nrows+1] = grid[ncols+1][1];
+
+	eval_columns(life, 1, 1);
+	if (ncols > 1)
+		eval_columns(life, ncols, ncols);
+	t3 = MPI_Wtime();
+
+	life->t_inner += t1 - t0;
+	life->t_wait  += t2 - t1;
+	life->t_edge  += t3 - t2;
+}// END eval_overlap()
+
+/*
+	eval_deep()
+		copy_bounds(), eval_rules() and update_grid() for several
+		generations with one exchange. The depth columns at each
+		side are sent to the neighbours in one message a side, then
+		each generation evaluates one column less at each side of
+		the ghost columns, whose far edge goes stale, until after
+		depth generations only columns 1 to ncols are left. The
+		neighbours work out the same ghost columns themselves, so
+		this trades depth times fewer messages for a little repeated
+		evaluation. The columns at each side, and the ghost columns
+		next to them, are one block of memory, so they are sent and
+		received where they are.
+*/
+void eval_deep (struct life_t * life, int steps) {
+	int i,s,lo,hi;
+
+	int size  = life->size;
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+	int depth = life->depth;
+	int len   = depth * (nrows+2);
+
+	uint8_t ** grid = life->grid;
+
+	if (size != 1) {
+		sendrecv_sides(life, grid[1], grid[ncols-depth+1], grid[1-depth],
+			grid[ncols+1], len);
+	} else {
+		memcpy(grid[ncols+1], grid[1], len);
+		memcpy(grid[1-depth], grid[ncols-depth+1], len);
+	}
+
+	for (s = 0; s < steps; s++) {
+		// columns lo-1 to hi+1 are up to date
+		lo   = 2 - depth + s;
+		hi   = ncols + depth - 1 - s;
+		grid = life->grid;
+
+		#pragma omp parallel for
+		for (i = lo-1; i <= hi+1; i++) {
+			grid[i][0]       = grid[i][nrows];
+			grid[i][nrows+1] = grid[i][1];
+		}
+
+		eval_columns(life, lo, hi);
+		update_grid(life);
+	}
+}// END eval_deep()
+
+/*
+	rebalance()
+		Moves columns between neighbouring processes so that
+		each one takes about as long per generation. Every
+		process's time spent evaluating since the last rebalance
+		(not waiting for its neighbours) is shared, each gets a
+		share of the columns in proportion to how fast it got
+		through its own, and the boundaries move towards that.
+		A boundary moves at most half way into the narrower of
+		the two processes either side of it, so columns only go
+		to a direct neighbour and every process keeps at least
+		one. Rank 0 logs the imbalance, slowest over mean time,
+		measured and predicted for the new split, after gen
+		generations.
+*/
+void rebalance (struct life_t * life, int gen) {
+	int r,shift,limit,moved;
+	double rate,sum,worst,mean,predicted;
+
+	int rank  = life->rank;
+	int size  = life->size;
+	int ncols = life->ncols;
+
+	double * times  = (double *) malloc(sizeof(double) * size);
+	double * rates  = (double *) malloc(sizeof(double) * size);
+	int    * widths = (int *) malloc(sizeof(int) * size);
+	int    * bound  = (int *) malloc(sizeof(int) * (size+1));
+	int    * target = (int *) malloc(sizeof(int) * (size+1));
+
+	MPI_Allgather(&life->t_work, 1, MPI_DOUBLE, times, 1, MPI_DOUBLE,
+		MPI_COMM_WORLD);
+	MPI_Allgather(&ncols, 1, MPI_INT, widths, 1, MPI_INT, MPI_COMM_WORLD);
+
+	// bound[r] is the first column of process r counting from 0
+	bound[0] = 0;
+	sum      = 0;
+	for (r = 0; r < size; r++) {
+		bound[r+1] = bound[r] + widths[r];
+		rates[r]   = widths[r] / (times[r] > 1e-9 ? times[r] : 1e-9);
+		sum       += rates[r];
+	}
+
+	// the boundary between the last process and the first stays put
+	target[0]    = 0;
+	target[size] = bound[size];
+	rate         = 0;
+	moved        = 0;
+	for (r = 1; r < size; r++) {
+		rate  += rates[r-1];
+		shift  = (int)(bound[size] * rate / sum + 0.5) - bound[r];
+		limit  = (widths[r-1] < widths[r] ? widths[r-1] : widths[r]) - 1;
+		limit /= 2;
+		if (shift > limit)
+			shift = limit;
+		if (shift < -limit)
+			shift = -limit;
+		target[r] = bound[r] + shift;
+		moved    += abs(shift);
+	}
+
+	if (rank == 0) {
+		worst = mean = predicted = 0;
+		for (r = 0; r < size; r++) {
+			mean += times[r] / size;
+			if (times[r] > worst)
+				worst = times[r];
+			if (times[r] * (target[r+1]-target[r]) / widths[r] > predicted)
+				predicted = times[r] * (target[r+1]-target[r]) / widths[r];
+		}
+		if (mean > 0)
+			printf("Rebalance at generation %d: imbalance %f, predicted %f, "
+				"%d columns moved\n", gen, worst / mean,
+				predicted / mean, moved);
+	}
+
+	if (moved > 0)
+		move_columns(life, target[rank] - bound[rank],
+			target[rank+1] - bound[rank+1]);
+	life->col0 = target[rank];
+
+	life->t_work = 0;
+
+	free(times);
+	free(rates);
+	free(widths);
+	free(bound);
+	free(target);
+}// END rebalance()
+
+/*
+	move_columns()
+		Moves the left boundary of this process left columns to
+		the right and the right boundary right columns to the
+		right, sending columns to or receiving them from the
+		neighbour on that side. The neighbours move the same
+		boundaries, so the sends and receives pair up. The columns
+		go straight from the old grid into the new one, whose
+		ghost columns are filled by the next exchange.
+*/
+void move_columns (struct life_t * life, int left, int right) {
+	int i0,i1;
+
+	int rank  = life->rank;
+	int size  = life->size;
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+	int len   = nrows+2;
+	int new_ncols = ncols - left + right;
+
+	uint8_t ** grid     = life->grid;
+	uint8_t ** new_grid = alloc_cells(new_ncols, nrows, 1);
+	uint8_t ** new_next = alloc_cells(new_ncols, nrows, 1);
+
+	MPI_Request reqs[4];
+	int nreqs = 0;
+	int left_rank  = (rank-1+size) % size;
+	int right_rank = (rank+1) % size;
+
+	enum TAGS {
+		TOLEFT,
+		TORIGHT
+	};
+
+	if (left < 0)
+		MPI_Irecv(new_grid[1], -left * len, MPI_UNSIGNED_CHAR, left_rank,
+			TORIGHT, MPI_COMM_WORLD, &reqs[nreqs++]);
+	if (right > 0)
+		MPI_Irecv(new_grid[new_ncols-right+1], right * len,
+			MPI_UNSIGNED_CHAR, right_rank, TOLEFT, MPI_COMM_WORLD,
+			&reqs[nreqs++]);
+	if (left > 0)
+		MPI_Isend(grid[1], left * len, MPI_UNSIGNED_CHAR, left_rank,
+			TOLEFT, MPI_COMM_WORLD, &reqs[nreqs++]);
+	if (right < 0)
+		MPI_Isend(grid[ncols+right+1], -right * len, MPI_UNSIGNED_CHAR,
+			right_rank, TORIGHT, MPI_COMM_WORLD, &reqs[nreqs++]);
+
+	// the columns that stay, old columns i0 to i1
+	i0 = left > 0 ? 1+left : 1;
+	i1 = right < 0 ? ncols+right : ncols;
+	memcpy(new_grid[i0-left], grid[i0], (i1-i0+1) * len);
+
+	MPI_Waitall(nreqs, reqs, MPI_STATUSES_IGNORE);
+
+	// next_grid has to match grid until every tile has been evaluated
+	memcpy(new_next[0], new_grid[0], (new_ncols+2) * len);
+
+	free_grids(life);
+	life->grid      = new_grid;
+	life->next_grid = new_next;
+	life->ncols     = new_ncols;
+
+	if (life->tile > 0)
+		reset_tiles(life);
+}// END move_columns()
+
 /*
 	update_grid()
-		Copies temporary values from next_grid into grid.
+		Makes next_grid the current grid by swapping the two, the
+		old grid being overwritten next generation.
 */
 void update_grid (struct life_t * life) {
+	uint8_t ** grid = life->grid;
+
+	life->grid      = life->next_grid;
+	life->next_grid = grid;
+
+	if (life->tile > 0)
+		update_tiles(life);
+	if (life->track_age)
+		age_cells(life);
+}// END update_grid()
+
+/*
+	age_cells()
+		Counts the generations each live cell has been alive for,
+		1 in the one it was born in, 0 for dead cells.
+*/
+void age_cells (struct life_t * life) {
 	int i,j;
 	int ncols = life->ncols;
 	int nrows = life->nrows;
-	int ** grid      = life->grid;
-	int ** next_grid = life->next_grid;
+	uint8_t ** grid = life->grid;
+	int ** age = life->age;
 
-	for (i = 0; i < ncols+2; i++)
-		for (j = 0; j < nrows+2; j++)
-			grid[i][j] = next_grid[i][j];
-}// END update_grid()
+	#pragma omp parallel for private(j)
+	for (i = 1; i <= ncols; i++)
+		for (j = 1; j <= nrows; j++)
+			age[i][j] = grid[i][j] != DEAD ? age[i][j]+1 : 0;
+}// END age_cells()
+
+/*
+	update_tiles()
+		Works out which tiles will be active next generation.
+*/
+void update_tiles (struct life_t * life) {
+	int i,tx,ty;
+	int active_now = 0;
+	int tiles_now[2];
+	int tiles_all[2];
+	int ntx   = life->ntx;
+	int nty   = life->nty;
+
+	for (i = 0; i < ntx*nty; i++)
+		if (life->active[i])
+			active_now++;
+
+	// --balance changes ntx, so the tiles are counted too
+	if (life->activefile != NULL) {
+		tiles_now[0] = active_now;
+		tiles_now[1] = ntx*nty;
+		MPI_Reduce(tiles_now, tiles_all, 2, MPI_INT, MPI_SUM, 0,
+			MPI_COMM_WORLD);
+		if (life->rank == 0)
+			fprintf(life->activefd, "%d %f\n", life->gen,
+				(double)tiles_all[0] / tiles_all[1]);
+	}
+	life->gen++;
+	life->tile_sum += ntx*nty;
+
+	for (i = 0; i < ntx*nty; i++)
+		life->active[i] = false;
+	for (tx = 0; tx < ntx; tx++)
+		for (ty = 0; ty < nty; ty++)
+			if (life->changed[tx*nty+ty])
+				mark_tile(life, life->active, tx, ty);
+}// END update_tiles()
 
 /*
 	allocate_grids()
-		Allocates memory for a 2D array of integers.
+		Allocates grid and next_grid, and the ages of the cells
+		with --age.
 */
 void allocate_grids (struct life_t * life) {
-	int i,j;
+	int i;
 	int ncols = life->ncols;
 	int nrows = life->nrows;
 
-	life->grid      = (int **) malloc(sizeof(int *) * (ncols+2));
-	life->next_grid = (int **) malloc(sizeof(int *) * (ncols+2));
+	life->grid      = alloc_cells(ncols, nrows, life->depth);
+	life->next_grid = alloc_cells(ncols, nrows, life->depth);
 
-	for (i = 0; i < ncols+2; i++) {
-		life->grid[i]      = (int *) malloc(sizeof(int) * (nrows+2));
-		life->next_grid[i] = (int *) malloc(sizeof(int) * (nrows+2));
+	if (life->track_age) {
+		life->age    = (int **) malloc(sizeof(int *) * (ncols+2));
+		life->age[0] = (int *) calloc((ncols+2) * (nrows+2), sizeof(int));
+		for (i = 1; i < ncols+2; i++)
+			life->age[i] = life->age[0] + i*(nrows+2);
 	}
 }// END allocate_grids()
 
 /*
-	init_grids()
-		Initialize cells based on input file, otherwise all cells
-		are DEAD.
+	alloc_cells()
+		Allocates a grid of ncols columns of nrows cells with
+		depth ghost columns a side and a ghost row at the top and
+		bottom, one byte a cell. The cells are one block, column
+		after column, and the grid is an array of pointers to the
+		columns, offset so that column 1 is the first real one.
+		grid[1-depth] is the start of the block.
 */
-void init_grids (struct life_t * life) {
-	FILE * fd;
-	int i,j;
+uint8_t ** alloc_cells (int ncols, int nrows, int depth) {
+	int i;
+	uint8_t ** grid;
+	uint8_t *  cells;
 
-	if (life->infile != NULL) {
-		if ((fd = fopen(life->infile, "r")) == NULL) {
-			perror("Failed to open file for input");
-			exit(EXIT_FAILURE);
-		}
+	grid  = (uint8_t **) malloc(sizeof(uint8_t *) * (ncols+2*depth));
+	cells = (uint8_t *) malloc((ncols+2*depth) * (nrows+2));
+	grid += depth-1;
+
+	for (i = 1-depth; i < ncols+depth+1; i++)
+		grid[i] = cells + (i+depth-1) * (nrows+2);
+
+	return grid;
+}// END alloc_cells()
+
+/*
+	allocate_tiles()
+		Allocates the tile flags and marks every tile active
+		for the first generation.
+*/
+void allocate_tiles (struct life_t * life) {
+	int i;
+
+	life->nty        = (life->nrows + life->tile - 1) / life->tile;
+	life->active_sum = 0;
+	life->tile_sum   = 0;
+	life->gen        = 0;
+	life->active     = NULL;
+	life->changed    = NULL;
+	life->bounds     = (int *) malloc(sizeof(int) *
+		2 * (life->nrows+2 + life->ncols+2));
 
-		if (fscanf(fd, "%d %d\n", &life->ncols, &life->nrows) == EOF) {
-			printf("File must at least define grid dimensions!\nExiting.\n");
+	reset_tiles(life);
+	for (i = 0; i < 2 * (life->nrows+2 + life->ncols+2); i++)
+		life->bounds[i] = DEAD;
+
+	if (life->activefile != NULL && life->rank == 0) {
+		if ((life->activefd = fopen(life->activefile, "w")) == NULL) {
+			perror("Failed to open file for active tile log");
 			exit(EXIT_FAILURE);
 		}
 	}
+}// END allocate_tiles()
+
+/*
+	reset_tiles()
+		(Re)allocates the tile flags for the current number of
+		columns and marks every tile active.
+*/
+void reset_tiles (struct life_t * life) {
+	int i;
+	int ntiles;
+
+	free(life->active);
+	free(life->changed);
+
+	life->ntx = (life->ncols + life->tile - 1) / life->tile;
+	ntiles    = life->ntx * life->nty;
+
+	life->active  = (bool *) malloc(sizeof(bool) * ntiles);
+	life->changed = (bool *) malloc(sizeof(bool) * ntiles);
+
+	for (i = 0; i < ntiles; i++) {
+		life->active[i]  = true;
+		life->changed[i] = false;
+	}
+}// END reset_tiles()
+
+/*
+	split()
+		Where part index starts when length cells are shared out
+		as evenly as possible between parts, part index+1 starting
+		where it ends.
+*/
+static int split (int length, int parts, int index) {
+	return (long) length * index / parts;
+}
+
+/*
+	owner()
+		Rank of the process whose block has cell i, j of the
+		world, counting from 0.
+*/
+static int owner (struct life_t * life, int i, int j) {
+	int rank;
+	int coords[2];
+
+	// the last part that starts at or before i, see split()
+	coords[0] = ((long) (i+1) * life->dims[0] - 1) / life->world_cols;
+	coords[1] = ((long) (j+1) * life->dims[1] - 1) / life->world_rows;
+	MPI_Cart_rank(life->cart, coords, &rank);
+
+	return rank;
+}
+
+/*
+	subarray()
+		Datatype of the ncols by nrows cells from column i0, row
+		j0 of a grid of cols columns of rows cells stored column
+		after column, as in memory and in the output file.
+*/
+static MPI_Datatype subarray (int cols, int rows, int ncols, int nrows,
+		int i0, int j0, MPI_Datatype cell) {
+	MPI_Datatype type;
+	int sizes[2]    = { cols, rows };
+	int subsizes[2] = { ncols, nrows };
+	int starts[2]   = { i0, j0 };
+
+	MPI_Type_create_subarray(2, sizes, subsizes, starts, MPI_ORDER_C, cell,
+		&type);
+	MPI_Type_commit(&type);
+
+	return type;
+}
+
+/*
+	open_cells()
+		Opens a grid file on every process with MPI-IO.
+*/
+static MPI_File open_cells (struct life_t * life, char * filename,
+		int mode) {
+	MPI_File fh;
+
+	if (MPI_File_open(MPI_COMM_WORLD, filename, mode, MPI_INFO_NULL,
+			&fh) != MPI_SUCCESS) {
+		if (life->rank == 0)
+			printf("Failed to open %s.\nExiting.\n", filename);
+		MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+	}
+
+	return fh;
+}
+
+/*
+	view_block()
+		Makes the process's block of the world all of the file it
+		sees, the cells after the header being 1 byte each or ints.
+*/
+static void view_block (struct life_t * life, MPI_File fh, int cell_bytes) {
+	MPI_Datatype cell = cell_bytes == 1 ? MPI_UNSIGNED_CHAR : MPI_INT;
+	MPI_Datatype block = subarray(life->world_cols, life->world_rows,
+		life->ncols, life->nrows, life->col0, life->row0, cell);
+
+	MPI_File_set_view(fh, sizeof(struct life_header), cell, block, "native",
+		MPI_INFO_NULL);
+	MPI_Type_free(&block);
+}
+
+/*
+	init_grids()
+		Shares the world out between the processes and fills in
+		each block: from the input file, a grid written by
+		write_grid() or text, or at random. Without an input file
+		every block is ncols by nrows.
+*/
+void init_grids (struct life_t * life) {
+	FILE * fd = NULL;
+	int i,j,n,cell_bytes;
+
+	life->world_cols = life->dims[0] * life->ncols;
+	life->world_rows = life->dims[1] * life->nrows;
+	cell_bytes       = 0;
+
+	if (life->infile != NULL)
+		cell_bytes = read_header(life, &fd);
+
+	life->col0  = split(life->world_cols, life->dims[0], life->coords[0]);
+	life->row0  = split(life->world_rows, life->dims[1], life->coords[1]);
+	life->ncols = split(life->world_cols, life->dims[0], life->coords[0]+1) -
+		life->col0;
+	life->nrows = split(life->world_rows, life->dims[1], life->coords[1]+1) -
+		life->row0;
+	if (life->ncols < 1 || life->nrows < 1) {
+		if (life->rank == 0)
+			printf("A %d by %d world is too small for %d processes.\n"
+				"Exiting.\n", life->world_cols, life->world_rows,
+				life->size);
+		MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+	}
 
 	allocate_grids(life);
 
-	for (i = 0; i < life->ncols+2; i++) {
-		for (j = 0; j < life->nrows+2; j++) {
-			life->grid[i][j]      = DEAD;
-			life->next_grid[i][j] = DEAD;
+	n = (life->ncols + 2*life->depth) * (life->nrows+2);
+	memset(life->grid[1-life->depth], DEAD, n);
+
+	if (life->infile == NULL) {
+		randomize_grid(life, INIT_PROB);
+		if (life->track_age)
+			for (i = 1; i <= life->ncols; i++)
+				for (j = 1; j <= life->nrows; j++)
+					life->age[i][j] = life->grid[i][j];
+	} else if (cell_bytes > 0) {
+		read_cells(life, cell_bytes);
+	} else {
+		scatter_cells(life, fd);
+	}
+
+	memcpy(life->next_grid[1-life->depth], life->grid[1-life->depth], n);
+}// END init_grids()
+
+/*
+	read_header()
+		Rank 0 opens the input file and tells every process the
+		size of the world from its first line, or its header if
+		it is a grid written by write_grid(). Returns the bytes a
+		cell of such a grid, or 0 for a text file, which is left
+		open in fd on rank 0 for scatter_cells().
+*/
+int read_header (struct life_t * life, FILE ** fd) {
+	struct life_header header;
+	int info[3];
+
+	if (life->rank == 0) {
+		if ((*fd = fopen(life->infile, "r")) == NULL) {
+			perror("Failed to open file for input");
+			MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+		}
+
+		if (fread(&header, sizeof(header), 1, *fd) == 1 &&
+				memcmp(header.magic, FILE_MAGIC, 4) == 0) {
+			info[0] = header.ncols;
+			info[1] = header.nrows;
+			info[2] = header.cell_bytes;
+			fclose(*fd);
+			*fd = NULL;
+		} else {
+			rewind(*fd);
+			if (fscanf(*fd, "%d %d\n", &info[0], &info[1]) != 2) {
+				printf("File must at least define grid dimensions!\nExiting.\n");
+				MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+			}
+			info[2] = 0;
 		}
 	}
 
-	if (life->infile != NULL) {
-		while (fscanf(fd, "%d %d\n", &i, &j) != EOF) {
-			life->grid[i][j]      = ALIVE;
-			life->next_grid[i][j] = ALIVE;
+	MPI_Bcast(info, 3, MPI_INT, 0, MPI_COMM_WORLD);
+	life->world_cols = info[0];
+	life->world_rows = info[1];
+
+	return info[2];
+}// END read_header()
+
+/*
+	scatter_cells()
+		Rank 0 reads the live cells of a text input file, a line
+		"i j" or "i j age" for each counting from 1 in the world,
+		and sends every process just the ones in its block. Lines
+		that aren't cells of the world are skipped.
+*/
+void scatter_cells (struct life_t * life, FILE * fd) {
+	int i,j,k,r,n,age,count;
+	char line[256];
+
+	int size    = life->size;
+	int ncells  = 0;
+	int * cells = NULL;   // i, j, age of each cell, counting from 0
+	int * sendbuf = NULL;
+	int * counts  = NULL;
+	int * displs  = NULL;
+	int * mine;
+
+	if (life->rank == 0) {
+		counts = (int *) calloc(size, sizeof(int));
+		displs = (int *) malloc(sizeof(int) * size);
+		n      = 1024;
+		cells  = (int *) malloc(sizeof(int) * 3 * n);
+
+		// a third number on a line is the age of the cell, see
+		// life2text
+		while (fgets(line, sizeof(line), fd) != NULL) {
+			k = sscanf(line, "%d %d %d", &i, &j, &age);
+			if (k < 2 || i < 1 || i > life->world_cols ||
+					j < 1 || j > life->world_rows)
+				continue;
+
+			if (ncells == n) {
+				n    *= 2;
+				cells = (int *) realloc(cells, sizeof(int) * 3 * n);
+			}
+			cells[3*ncells]   = i-1;
+			cells[3*ncells+1] = j-1;
+			cells[3*ncells+2] = k > 2 ? age : 1;
+			counts[owner(life, i-1, j-1)] += 3;
+			ncells++;
 		}
-		
 		fclose(fd);
+
+		// every process's cells together, in its own coordinates
+		displs[0] = 0;
+		for (r = 1; r < size; r++)
+			displs[r] = displs[r-1] + counts[r-1];
+		sendbuf = (int *) malloc(sizeof(int) * (3 * ncells + 1));
+		for (k = 0; k < ncells; k++) {
+			int coords[2];
+
+			r = owner(life, cells[3*k], cells[3*k+1]);
+			MPI_Cart_coords(life->cart, r, 2, coords);
+			n = displs[r];
+			sendbuf[n]   = cells[3*k] + 1 -
+				split(life->world_cols, life->dims[0], coords[0]);
+			sendbuf[n+1] = cells[3*k+1] + 1 -
+				split(life->world_rows, life->dims[1], coords[1]);
+			sendbuf[n+2] = cells[3*k+2];
+			displs[r] += 3;
+		}
+		for (r = 0; r < size; r++)
+			displs[r] -= counts[r];
+		free(cells);
+	}
+
+	MPI_Scatter(counts, 1, MPI_INT, &count, 1, MPI_INT, 0, MPI_COMM_WORLD);
+	mine = (int *) malloc(sizeof(int) * (count + 1));
+	MPI_Scatterv(sendbuf, counts, displs, MPI_INT, mine, count, MPI_INT, 0,
+		MPI_COMM_WORLD);
+
+	for (k = 0; k < count; k += 3) {
+		life->grid[mine[k]][mine[k+1]] = ALIVE;
+		if (life->track_age)
+			life->age[mine[k]][mine[k+1]] = mine[k+2];
+	}
+
+	free(mine);
+	free(sendbuf);
+	free(counts);
+	free(displs);
+}// END scatter_cells()
+
+/*
+	read_cells()
+		Every process reads its block of a grid written by
+		write_grid() straight into its grid, or its ages, with
+		one collective MPI-IO read.
+*/
+void read_cells (struct life_t * life, int cell_bytes) {
+	int i,j;
+	int ** age;
+	MPI_File fh;
+	MPI_Datatype block;
+
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+	int depth = life->depth;
+
+	fh = open_cells(life, life->infile, MPI_MODE_RDONLY);
+	view_block(life, fh, cell_bytes);
+
+	if (cell_bytes == 1) {
+		block = subarray(ncols+2*depth, nrows+2, ncols, nrows, depth, 1,
+			MPI_UNSIGNED_CHAR);
+		MPI_File_read_all(fh, life->grid[1-depth], 1, block,
+			MPI_STATUS_IGNORE);
+		if (life->track_age)
+			for (i = 1; i <= ncols; i++)
+				for (j = 1; j <= nrows; j++)
+					life->age[i][j] = life->grid[i][j];
 	} else {
-		randomize_grid(life, INIT_PROB);
+		// ages, only kept with --age
+		age = life->age;
+		if (!life->track_age) {
+			age    = (int **) malloc(sizeof(int *) * (ncols+2));
+			age[0] = (int *) malloc(sizeof(int) * (ncols+2) * (nrows+2));
+			for (i = 1; i < ncols+2; i++)
+				age[i] = age[0] + i*(nrows+2);
+		}
+		block = subarray(ncols+2, nrows+2, ncols, nrows, 1, 1, MPI_INT);
+		MPI_File_read_all(fh, age[0], 1, block, MPI_STATUS_IGNORE);
+		for (i = 1; i <= ncols; i++)
+			for (j = 1; j <= nrows; j++)
+				life->grid[i][j] = age[i][j] > 0 ? ALIVE : DEAD;
+		if (!life->track_age) {
+			free(age[0]);
+			free(age);
+		}
 	}
-}// END init_grids()
+
+	MPI_Type_free(&block);
+	MPI_File_close(&fh);
+}// END read_cells()
 
 /*
 	write_grid()
-		Dumps the current state of life.grid to life.outfile.
-		Only outputs the coordinates of !DEAD cells.
+		Writes the whole world to life.outfile with one collective
+		MPI-IO write, each process its block straight from its
+		grid: a header, then every cell column after column, a
+		byte each, or their ages as ints with --age. life2text
+		turns it into the text --input reads.
 */
 void write_grid (struct life_t * life) {
-	FILE * fd;
-	int i,j;
-	int ncols   = life->ncols;
-	int nrows   = life->nrows;
-	int ** grid = life->grid;
+	int cell_bytes;
+	MPI_File fh;
+	MPI_Datatype block;
+	struct life_header header;
 
-	if (life->outfile != NULL) {
-		if ((fd = fopen(life->outfile, "w")) == NULL) {
-			perror("Failed to open file for output");
-			exit(EXIT_FAILURE);
-		}
+	int ncols = life->ncols;
+	int nrows = life->nrows;
+	int depth = life->depth;
 
-		fprintf(fd, "%d %d\n", ncols, nrows);
+	if (life->outfile == NULL)
+		return;
 
-		for (i = 1; i <= ncols; i++) {
-			for (j = 1; j <= nrows; j++) {
-				if (grid[i][j] != DEAD)
-					fprintf(fd, "%d %d\n", i, j);
-			}
-		}
+	cell_bytes = life->track_age ? sizeof(int) : 1;
 
-		fclose(fd);
+	fh = open_cells(life, life->outfile, MPI_MODE_CREATE | MPI_MODE_WRONLY);
+	MPI_File_set_size(fh, sizeof(header) + (MPI_Offset) life->world_cols *
+		life->world_rows * cell_bytes);
+
+	if (life->rank == 0) {
+		memcpy(header.magic, FILE_MAGIC, 4);
+		header.ncols      = life->world_cols;
+		header.nrows      = life->world_rows;
+		header.cell_bytes = cell_bytes;
+		MPI_File_write_at(fh, 0, &header, sizeof(header), MPI_BYTE,
+			MPI_STATUS_IGNORE);
+	}
+
+	view_block(life, fh, cell_bytes);
+	if (life->track_age) {
+		block = subarray(ncols+2, nrows+2, ncols, nrows, 1, 1, MPI_INT);
+		MPI_File_write_all(fh, life->age[0], 1, block, MPI_STATUS_IGNORE);
+	} else {
+		block = subarray(ncols+2*depth, nrows+2, ncols, nrows, depth, 1,
+			MPI_UNSIGNED_CHAR);
+		MPI_File_write_all(fh, life->grid[1-depth], 1, block,
+			MPI_STATUS_IGNORE);
 	}
+
+	MPI_Type_free(&block);
+	MPI_File_close(&fh);
 }// write_grid()
 
 /*
@@ -275,18 +1532,60 @@ void write_grid (struct life_t * life) {
 		with allocate_grids().
 */
 void free_grids (struct life_t * life) {
-	int i;
-	int ncols = life->ncols;
+	int depth = life->depth;
 
-	for (i = 0; i < ncols+2; i++) {
-		free(life->grid[i]);
-		free(life->next_grid[i]);
-	}
-
-	free(life->grid);
-	free(life->next_grid);
+	free(life->grid[1-depth]);
+	free(life->next_grid[1-depth]);
+	free(life->grid - (depth-1));
+	free(life->next_grid - (depth-1));
 }// free_grids()
 
+/*
+	free_tiles()
+		Frees the tile flags allocated by allocate_tiles().
+*/
+void free_tiles (struct life_t * life) {
+	free(life->active);
+	free(life->changed);
+	free(life->bounds);
+
+	if (life->activefd != NULL)
+		fclose(life->activefd);
+}// free_tiles()
+
+/*
+	report_tiles()
+		Prints the mean fraction of tiles evaluated per generation
+		over all processes.
+*/
+void report_tiles (struct life_t * life) {
+	long local[2] = { life->active_sum, life->tile_sum };
+	long all[2];
+
+	MPI_Reduce(local, all, 2, MPI_LONG, MPI_SUM, 0, MPI_COMM_WORLD);
+
+	if (life->rank == 0 && all[1] > 0)
+		printf("Mean active tile fraction: %f\n", (double)all[0] / all[1]);
+}// report_tiles()
+
+/*
+	report_overlap()
+		Prints the time spent in each phase of eval_overlap(),
+		the slowest process's figures. The exchange was in flight
+		for inner + waiting, of which inner was hidden behind
+		evaluation.
+*/
+void report_overlap (struct life_t * life) {
+	double local[3] = { life->t_inner, life->t_wait, life->t_edge };
+	double worst[3];
+
+	MPI_Reduce(local, worst, 3, MPI_DOUBLE, MPI_MAX, 0, MPI_COMM_WORLD);
+
+	if (life->rank == 0)
+		printf("Overlap: inner columns %f s (exchange hidden), waiting %f s, "
+			"edge columns %f s\n", worst[0], worst[1], worst[2]);
+}// report_overlap()
+
 /*
 	rand_double()
 		Generate a random double between 0 and 1.
@@ -329,7 +1628,24 @@ void seed_random (int rank) {
 void cleanup (struct life_t * life) {
 	write_grid(life);
 	free_grids(life);
+	free(life->bits);
+	free(life->sums);
 
+	if (life->track_age) {
+		free(life->age[0]);
+		free(life->age);
+	}
+
+	if (life->tile > 0) {
+		report_tiles(life);
+		free_tiles(life);
+	}
+
+	if (life->overlap)
+		report_overlap(life);
+
+	MPI_Type_free(&life->row_type);
+	MPI_Comm_free(&life->cart);
 	MPI_Finalize();
 }// cleanup()
 
@@ -342,8 +1658,18 @@ void usage () {
 	printf("  -c|--columns number   Number of columns in grid. Default: %d\n", DEFAULT_SIZE);
 	printf("  -r|--rows number      Number of rows in grid. Default: %d\n", DEFAULT_SIZE);
 	printf("  -g|--gens number      Number of generations to run. Default: %d\n", DEFAULT_GENS);
-	printf("  -i|--input filename   Input file. See README for format. Default: none.\n");
-	printf("  -o|--output filename  Output file. Default: none.\n");
+	printf("  -i|--input filename   Input file, text or an output file. See README for format. Default: none.\n");
+	printf("  -o|--output filename  Output file of the whole world, see life2text. Default: none.\n");
+	printf("  -T|--tile number      Only evaluate tiles of this size that are active. Default: off.\n");
+	printf("  -A|--active-log file  Write the active tile fraction of every generation. Default: none.\n");
+	printf("  -O|--overlap          Evaluate inner columns while the sides are exchanged. Default: off.\n");
+	printf("  -D|--depth number     Ghost columns a side, exchanged every depth generations. Default: %d\n", DEFAULT_DEPTH);
+	printf("  -z|--compress         Send the side columns as bits rather than bytes. Default: off.\n");
+	printf("  -B|--balance number   Move columns between processes every number generations. Default: off.\n");
+	printf("  -K|--kernel name      Count neighbours one by one (rules) or from running sums (sums). Default: rules.\n");
+	printf("  -b|--blocks           Lay the processes out as a 2D grid of blocks, not a row. Default: off.\n");
+	printf("  -j|--threads number   OpenMP threads evaluating each process's columns. Default: %d\n", DEFAULT_THREADS);
+	printf("  -a|--age              Count the generations each cell has been alive, written to the output. Default: off.\n");
 	printf("  -h|--help             This help page.\n");
 	printf("\nSee README for more information.\n\n");
 
@@ -380,6 +1706,41 @@ void parse_args (struct life_t * life, int argc, char ** argv) {
 			case 'o':
 				life->outfile = optarg;
 				break;
+			case 'T':
+				life->tile = strtol(optarg, (char**) NULL, 10);
+				break;
+			case 'A':
+				life->activefile = optarg;
+				break;
+			case 'O':
+				life->overlap = true;
+				break;
+			case 'D':
+				life->depth = strtol(optarg, (char**) NULL, 10);
+				break;
+			case 'z':
+				life->compress = true;
+				break;
+			case 'B':
+				life->balance = strtol(optarg, (char**) NULL, 10);
+				break;
+			case 'a':
+				life->track_age = true;
+				break;
+			case 'b':
+				life->blocks = true;
+				break;
+			case 'j':
+				life->threads = strtol(optarg, (char**) NULL, 10);
+				break;
+			case 'K':
+				if (strcmp(optarg, "sums") == 0)
+					life->kernel = KERNEL_SUMS;
+				else if (strcmp(optarg, "rules") == 0)
+					life->kernel = KERNEL_RULES;
+				else
+					usage();
+				break;
 			case 'h':
 			case '?':
 				usage();
@@ -390,6 +1751,48 @@ void parse_args (struct life_t * life, int argc, char ** argv) {
 		}
 	}
 
+	// eval_tiles() does its own bookkeeping of the sides
+	if (life->overlap && life->tile > 0) {
+		printf("--overlap can't be used with --tile, ignoring it.\n");
+		life->overlap = false;
+	}
+
+	if (life->depth < 1)
+		life->depth = 1;
+	if (life->depth > 1 && (life->overlap || life->tile > 0)) {
+		printf("--depth can't be used with --overlap or --tile, ignoring it.\n");
+		life->depth = 1;
+	}
+
+	// eval_deep() keeps columns in the ghost zones of the old split
+	if (life->balance > 0 && life->depth > 1) {
+		printf("--balance can't be used with --depth, ignoring it.\n");
+		life->balance = 0;
+	}
+
+	// the other modes move or pack whole columns
+	if (life->blocks && (life->depth > 1 || life->balance > 0 ||
+			life->compress)) {
+		printf("--blocks can't be used with --depth, --balance or "
+			"--compress, ignoring it.\n");
+		life->blocks = false;
+	}
+
+	// move_columns() only moves the cells
+	if (life->balance > 0 && life->track_age) {
+		printf("--age can't be used with --balance, ignoring it.\n");
+		life->track_age = false;
+	}
+
+	if (life->threads < 1)
+		life->threads = 1;
+#ifndef _OPENMP
+	if (life->threads > 1) {
+		printf("Built without OpenMP, --threads ignored.\n");
+		life->threads = 1;
+	}
+#endif
+
 	// Backwards compatible argument parsing
 	if (optind == 1) {
 		if (argc > 1)
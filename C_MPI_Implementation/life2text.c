@@ -0,0 +1,78 @@
+/*******************************************
+MPI Life 1.0
+
+Converts a grid written by Life --output to the
+text format Life --input reads: the size of the
+world, then "i j" for every live cell, counting
+from 1, or "i j age" if the ages were written.
+
+To run:
+life2text <grid file> [text file]
+
+The text goes to standard output if no text
+file is given.
+*******************************************/
+
+#include <mpi.h>
+
+#include "Defaults.h" // For the output file header
+
+#include <stdlib.h>
+#include <string.h>
+
+int main(int argc, char ** argv) {
+
+	int i,j;
+	FILE * in;
+	FILE * out = stdout;
+	struct life_header header;
+	unsigned char * column;
+	int32_t age;
+
+	if (argc < 2) {
+		printf("Usage: life2text <grid file> [text file]\n");
+		exit(EXIT_FAILURE);
+	}
+
+	if ((in = fopen(argv[1], "rb")) == NULL) {
+		perror("Failed to open file for input");
+		exit(EXIT_FAILURE);
+	}
+	if (fread(&header, sizeof(header), 1, in) != 1 ||
+			memcmp(header.magic, FILE_MAGIC, 4) != 0) {
+		printf("%s wasn't written by Life --output.\nExiting.\n", argv[1]);
+		exit(EXIT_FAILURE);
+	}
+	if (argc > 2 && (out = fopen(argv[2], "w")) == NULL) {
+		perror("Failed to open file for output");
+		exit(EXIT_FAILURE);
+	}
+
+	// one column at a time, the world needn't fit in memory
+	column = (unsigned char *) malloc((size_t) header.nrows *
+		header.cell_bytes);
+
+	fprintf(out, "%d %d\n", header.ncols, header.nrows);
+	for (i = 1; i <= header.ncols; i++) {
+		if (fread(column, header.cell_bytes, header.nrows, in) !=
+				(size_t) header.nrows) {
+			printf("%s is cut short.\nExiting.\n", argv[1]);
+			exit(EXIT_FAILURE);
+		}
+		for (j = 1; j <= header.nrows; j++) {
+			if (header.cell_bytes == 1) {
+				if (column[j-1] != DEAD)
+					fprintf(out, "%d %d\n", i, j);
+			} else {
+				memcpy(&age, column + (j-1) * sizeof(age), sizeof(age));
+				if (age > 0)
+					fprintf(out, "%d %d %d\n", i, j, age);
+			}
+		}
+	}
+
+	free(column);
+	fclose(in);
+	fclose(out);
+	exit(EXIT_SUCCESS);
+}
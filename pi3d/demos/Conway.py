@@ -2,19 +2,59 @@
 this shows how it is possible to recycle images from the renderbuffer
 and use the very fast processing speed of the GPU to do certain tasks.
 """
+import os
 import sys
+# import demo moves to pi3d/, so make the --input and --output paths absolute
+# while they are still relative to where the script was started
+for name in ('--input', '--output'):
+  if name in sys.argv[3:-1]:
+    at = sys.argv.index(name) + 1
+    sys.argv[at] = os.path.abspath(sys.argv[at])
 import ctypes
 import demo
 import pi3d
 import time
+import numpy
 from pi3d.constants import *
+from life_common import read_grid, write_grid, random_cells
 
 print sys.argv[1]
 print sys.argv[2]
 
-WIDTH = int(sys.argv[1]) 
-HEIGHT = int(sys.argv[1]) 
-DISPLAY = pi3d.Display.create(w=WIDTH, h=HEIGHT)
+def option(name, default):
+  """ value after name on the command line, or default """
+  if name in sys.argv[3:]:
+    return type(default)(sys.argv[sys.argv.index(name) + 1])
+  return default
+
+# length of side, or width x height like 6000x4000
+SIZE = [int(v) for v in sys.argv[1].split('x')]
+WIDTH = SIZE[0]
+HEIGHT = SIZE[-1]
+EVOLUTIONS = int(sys.argv[2])
+# --fbo keeps every generation on the GPU, drawing straight into the other
+# texture, --stats N reads it back every N generations to count the cells
+# and --per-frame K works out K generations for every frame shown
+FBO = '--fbo' in sys.argv[3:]
+STATS = option('--stats', 0)
+PER_FRAME = option('--per-frame', 1)
+# --tile T splits the world into textures of at most T cells a side so it can
+# be any size, starting from a random soup or an --input .in file
+TILE = option('--tile', 0)
+INPUT = option('--input', '')
+OUTPUT = option('--output', '')
+if FBO and TILE:
+  # --fbo would build a single texture the size of the world, which is what
+  # --tile is there to avoid
+  sys.exit("--fbo and --tile can't be used together")
+if TILE and INPUT:
+  WIDTH, HEIGHT, cells = read_grid(INPUT)
+# the display only has to be as big as the grid when the grid is drawn to it
+MAX_DISPLAY = 512
+if TILE:
+  DISPLAY = pi3d.Display.create(w=min(WIDTH, MAX_DISPLAY), h=min(HEIGHT, MAX_DISPLAY))
+else:
+  DISPLAY = pi3d.Display.create(w=WIDTH, h=HEIGHT)
 CAMERA = pi3d.Camera(is_3d=False)
 shader = pi3d.Shader("shaders/conway")
 
@@ -26,13 +66,63 @@ sprite.set_draw_details(shader, [tex[0]])
 sprite.set_2d_size(WIDTH, HEIGHT, 0.0, 0.0) # used to get pixel scale by shader
 
 ti = 0 # variable to toggle between two textures
-img = (ctypes.c_char * (WIDTH * HEIGHT * 3))() # to hold pixels
 
 #open("time_serialGPU/time_serial"+"on"+str(WIDTH)+"x"+str(HEIGHT)+".txt", "w").write("")
 timetotal0 = time.clock()
 evolutions = 0
+if FBO:
+  life = pi3d.PingPong(WIDTH, HEIGHT, sprite, shader, tex[0])
+  pixels = pi3d.PixelBuffer(WIDTH, HEIGHT)
+  show = pi3d.Shader("shaders/conway_show")
+  # wall clock time, clock() would leave out the time spent waiting on the GPU
+  timefbo0 = time.time()
+  while DISPLAY.loop_running() and evolutions < EVOLUTIONS:
+    # stop short at the end of the run or when the stats are due
+    todo = min(PER_FRAME, EVOLUTIONS - evolutions)
+    if STATS:
+      todo = min(todo, STATS - evolutions % STATS)
+    life.step(todo)
+    evolutions += todo
+    life.draw(show)
+    if STATS and evolutions % STATS == 0:
+      arr = life.read(pixels)
+      # live cells are the blue ones, as in the shader
+      print "Generation " + str(evolutions) + " population: " + \
+            str((arr[:, :, 2] > 63).sum())
+  opengles.glFinish() # the draws are queued, wait for them to be done
+  print "Time for " + str(evolutions) + " number of evolutions was: " + \
+        str(time.time() - timefbo0)
+if TILE:
+  life = pi3d.TiledPingPong(WIDTH, HEIGHT, sprite, pi3d.Shader("shaders/conway_tile"), TILE)
+  world = numpy.zeros((HEIGHT, WIDTH, 3), dtype=numpy.uint8)
+  if INPUT:
+    for i, j in cells:
+      world[j - 1, i - 1, 2] = 255
+  else:
+    world[:, :, 2] = random_cells(WIDTH, HEIGHT) * 255
+  life.write(world)
+  timefbo0 = time.time()
+  while DISPLAY.loop_running() and evolutions < EVOLUTIONS:
+    todo = min(PER_FRAME, EVOLUTIONS - evolutions)
+    if STATS:
+      todo = min(todo, STATS - evolutions % STATS)
+    life.step(todo)
+    evolutions += todo
+    if STATS and evolutions % STATS == 0:
+      print "Generation " + str(evolutions) + " population: " + \
+            str((life.read()[:, :, 2] > 63).sum())
+  opengles.glFinish()
+  print "Time for " + str(evolutions) + " number of evolutions was: " + \
+        str(time.time() - timefbo0)
+  if OUTPUT:
+    rows, cols = numpy.nonzero(life.read()[:, :, 2] > 63)
+    write_grid(OUTPUT, WIDTH, HEIGHT, zip((cols + 1).tolist(), (rows + 1).tolist()))
 #while DISPLAY.loop_running() and evolutions < int(argv[2]):
-while DISPLAY.loop_running():
+if not FBO and not TILE:
+  # only the readback loop below needs the pixels on the host, a --tile
+  # world can be far bigger than memory allows
+  img = (ctypes.c_char * (WIDTH * HEIGHT * 3))() # to hold pixels
+while not FBO and not TILE and DISPLAY.loop_running():
   sprite.draw()
   
   ti = (ti+1) % 2
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+""" CPU only conways game of life, no display or GPU needed, so it can be
+run and timed on nodes without a VideoCore. Called from run.py like:
+
+  python pi3d/demos/HeadlessConway.py engine length num_evolutions [-i file.in]
+"""
+import argparse
+import time
+
+from life_common import DEFAULT_SIZE, DEFAULT_GENS
+from numpy_life import NumpyLife
+from bitpacked_life import BitLife
+from hashlife import HashLife, DEFAULT_CACHE_MB
+from tiled_life import TiledLife, DEFAULT_TILE
+from parallel_life import ParallelLife
+from shm_ranks import DecomposedLife
+
+ENGINES = {
+  'numpy': NumpyLife,
+  'bitpacked': BitLife,
+  'hashlife': HashLife,
+  'tiled': TiledLife,
+  'parallel': ParallelLife,
+  'ranks': DecomposedLife,
+}
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description='headless Game of Life')
+  parser.add_argument('engine', choices=sorted(ENGINES))
+  parser.add_argument('length', type=int, nargs='?', default=DEFAULT_SIZE,
+                      help='length of side of the square world')
+  parser.add_argument('evolutions', type=int, nargs='?', default=DEFAULT_GENS)
+  parser.add_argument('-i', '--input', help='.in file, overrides length')
+  parser.add_argument('-o', '--output', help='write the final live cells here')
+  parser.add_argument('-s', '--seed', type=int, help='seed for a random start')
+  parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                      help='hashlife: memory cap for the node caches')
+  parser.add_argument('--wrap', action='store_true',
+                      help='hashlife: wrap round like the C engine (slow)')
+  parser.add_argument('--tile', type=int, default=DEFAULT_TILE,
+                      help='tiled: length of side of a tile in cells')
+  parser.add_argument('--active-log',
+                      help='tiled: write the active tile fraction of every '
+                           'generation to this file')
+  parser.add_argument('--workers', type=int,
+                      help='parallel: worker processes, default one per core')
+  parser.add_argument('--ranks', type=int,
+                      help='ranks: local processes standing in for MPI '
+                           'ranks, default one per core')
+  return parser.parse_args()
+
+
+def main():
+  args = parse_args()
+  engine = ENGINES[args.engine]
+  options = {}
+  if args.engine == 'hashlife':
+    options['max_mb'] = args.cache_mb
+    options['wrap'] = args.wrap
+  elif args.engine == 'tiled':
+    options['tile'] = args.tile
+  elif args.engine == 'parallel':
+    options['workers'] = args.workers
+  elif args.engine == 'ranks':
+    options['ranks'] = args.ranks
+  if args.input:
+    life = engine.from_file(args.input, **options)
+  else:
+    life = engine.random(args.length, args.length, seed=args.seed, **options)
+
+  timetotal0 = time.time()
+  life.step(args.evolutions)
+  timetotal1 = time.time()
+  if hasattr(life, 'close'):
+    life.close()
+
+  print("Time for " + str(args.evolutions) + " number of evolutions was: " +
+        str(timetotal1 - timetotal0))
+  print("Population: " + str(life.population()))
+  fractions = getattr(life, 'active_fractions', None)
+  if fractions:
+    print("Mean active tile fraction: " + str(sum(fractions) / len(fractions)) +
+          " final: " + str(fractions[-1]))
+    if args.active_log:
+      with open(args.active_log, 'w') as f:
+        for generation, fraction in enumerate(fractions):
+          f.write('%d %f\n' % (generation, fraction))
+  if args.output:
+    life.write(args.output)
+
+if __name__ == '__main__':
+  main()
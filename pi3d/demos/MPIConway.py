@@ -5,38 +5,40 @@ and use the very fast processing speed of the GPU to do certain tasks.
 """
 #import SDSC_functions
 import sys
-import ctypes
 import demo
 import pi3d
-import Image
 import numpy
-import numpy.ctypeslib
 import time
-import math
 from pi3d.constants import *
 from mpi4py import MPI
 
-comm = MPI.COMM_WORLD # opens up the MPI world. Looks at the network
-nprocs = comm.Get_size() # the number of cores. Don't worry, it's single core.
-rank = comm.Get_rank() # the number of nodes. You only care about this for boundaries. 
-#print "nprocs is: " + str(nprocs)
-#print "rank is: " + str(rank)
-
-# converts the PIL to image buffer for shader
-def numpy_pil_to_buf(arr, w, h):
-	img = (ctypes.c_char * (w * h * 3))()
-	idx = 0
-	for row in arr:
-		for RGB_object in row:
-			for RGB_val in RGB_object:
-				img[idx] = ctypes.c_char( chr(RGB_val) )
-				idx += 1
-	return img
-
-
-WIDTH = int(sys.argv[1])/nprocs
-HEIGHT = int(sys.argv[1])/nprocs
+from cart_halo import cart_grid, extent, neighbors, HaloExchange
+from halo_codec import HaloCodec
+
+# ranks laid out as a periodic 2D grid of tiles, as near square as nprocs
+# allows, see cart_halo.py
+comm = cart_grid(MPI.COMM_WORLD)
+nprocs = comm.Get_size()
+rank = comm.Get_rank()
+ny, nx = comm.dims
+y_index, x_index = comm.Get_coords(rank)
+
+# --depth k keeps k rings of ghosts, swapped every k generations
+DEPTH = int(sys.argv[sys.argv.index('--depth') + 1]) if '--depth' in sys.argv[3:] else 1
+# each rank owns its share of the length x length world plus the ghost rings
+LENGTH = int(sys.argv[1])
+x0, x1 = extent(LENGTH, nx, x_index)
+y0, y1 = extent(LENGTH, ny, y_index)
+WIDTH = x1 - x0 + 2 * DEPTH
+HEIGHT = y1 - y0 + 2 * DEPTH
 EVOLUTIONS = int(sys.argv[2]) 
+# --halo only reads back and uploads the border strips, not the whole grid
+HALO = '--halo' in sys.argv[3:]
+# --overlap uploads the interior to the GPU while the halo is in flight and
+# writes the ghosts in afterwards, timing each phase
+OVERLAP = '--overlap' in sys.argv[3:]
+# --compress sends the halo as bits or run lengths, see halo_codec.py
+COMPRESS = '--compress' in sys.argv[3:]
 DISPLAY = pi3d.Display.create(w=WIDTH, h=HEIGHT)
 CAMERA = pi3d.Camera(is_3d=False)
 shader = pi3d.Shader("shaders/conway")
@@ -44,45 +46,39 @@ shader = pi3d.Shader("shaders/conway")
 #open("/export/home/akissing/strongtime_hybrid/strongtime"+str(nprocs)+"on"+
 #str(WIDTH*nprocs)+"x"+str(HEIGHT*nprocs)+".txt", "w").write("")
 
-nx = WIDTH 
-ny = HEIGHT
-n_tiles = nx*ny 
-
-
-# establish 2D array of ranks
-tile_ranks = numpy.arange(0, n_tiles).reshape((ny, nx))
-
-# determine the x and y indexes of rank
-x_index = rank % nx
-y_index = rank / nx
-
-#print x_index
-#print y_index
-#print tile_ranks
-#print tile_ranks[y_index, x_index]
-
-# neighbors is a simple dictionary holding the rank
-# of the neighboring tile in the following directions:
-# 't' : top
-# 'b' : bottom
-# 'l' : left
-# 'r' : right
-# 'tl' : top left
-# 'tr' : top right
-# 'bl' : bottom left
-# 'br' : bottom right
-
-neighbors = {}
-neighbors['t'] = tile_ranks[(y_index + 1) % ny, x_index]
-neighbors['b'] = tile_ranks[(y_index - 1) % ny, x_index]
-neighbors['l'] = tile_ranks[y_index, (x_index - 1) % nx]
-neighbors['r'] = tile_ranks[y_index, (x_index + 1) % nx]
-neighbors['tl'] = tile_ranks[(y_index + 1) % ny, (x_index - 1) % nx]
-neighbors['tr'] = tile_ranks[(y_index + 1) % ny, (x_index + 1) % nx]
-neighbors['bl'] = tile_ranks[(y_index - 1) % ny, (x_index - 1) % nx]
-neighbors['br'] = tile_ranks[(y_index - 1) % ny, (x_index + 1) % nx]
-
-nb = neighbors
+# the encoder, decoder and receive buffer for each tag with --compress
+codecs = {}
+
+# comm.Sendrecv(), through a HaloCodec each way with --compress
+def sendrecv(send, dest, recv, source, tag):
+	if not COMPRESS:
+		comm.Sendrecv(send, dest=dest, sendtag=tag,
+				recvbuf=recv, source=source, recvtag=tag)
+		return
+	if tag not in codecs:
+		decoder = HaloCodec(recv.shape)
+		codecs[tag] = (HaloCodec(send.shape), decoder,
+				numpy.empty(decoder.size, dtype=numpy.uint8))
+	encoder, decoder, buf = codecs[tag]
+	status = MPI.Status()
+	comm.Sendrecv(encoder.encode(send), dest=dest, sendtag=tag,
+			recvbuf=buf, source=source, recvtag=tag, status=status)
+	decoder.decode(buf[:status.Get_count(MPI.BYTE)], recv)
+
+# swaps the border strips with the neighbours, left and right first so the
+# rows sent up and down carry the corner cells on their ends
+def exchange_halo(halo, nb, top, bot):
+	edges, ghosts, k = halo.edges, halo.ghosts, halo.depth
+	sendrecv(edges['r'], nb['r'], ghosts['l'], nb['l'], 0)
+	sendrecv(edges['l'], nb['l'], ghosts['r'], nb['r'], 1)
+	top[:, :k] = ghosts['l'][-k:]
+	top[:, k:-k] = edges['t']
+	top[:, -k:] = ghosts['r'][-k:]
+	bot[:, :k] = ghosts['l'][:k]
+	bot[:, k:-k] = edges['b']
+	bot[:, -k:] = ghosts['r'][:k]
+	sendrecv(top, nb['t'], ghosts['b'], nb['b'], 2)
+	sendrecv(bot, nb['b'], ghosts['t'], nb['t'], 3)
 
 tex = []
 tex.append(pi3d.Texture("textures/Roof.png", mipmap=False))
@@ -92,7 +88,23 @@ sprite.set_draw_details(shader, [tex[0]])# how to call the conway.vs basically
 sprite.set_2d_size(WIDTH, HEIGHT, 0.0, 0.0) # used to get pixel scale by shader
 
 ti = 0 # variable to toggle between two textures
-img = (ctypes.c_char * (WIDTH * HEIGHT * 3))() # to hold pixels, make 1x1 larger maybe?
+if HALO:
+	halo = pi3d.Halo(WIDTH, HEIGHT, depth=DEPTH)
+	# the rows sent up and down, with the corners on their ends
+	top = numpy.empty_like(halo.ghosts['t'])
+	bot = numpy.empty_like(halo.ghosts['b'])
+	nb = neighbors(comm)
+else:
+	# pixels read back from the GPU, arr is a numpy view of the same memory so
+	# the edges are edited in place and uploaded again without any copies
+	pixels = pi3d.PixelBuffer(WIDTH, HEIGHT)
+	arr = pixels.array
+	exchange = HaloExchange(comm, arr, DEPTH, COMPRESS)
+	# for copying the image on the GPU between exchanges and for the ghost
+	# strips of arr, to write them into the texture
+	halo = pi3d.Halo(WIDTH, HEIGHT, depth=DEPTH)
+# wall clock seconds spent in each phase of --overlap
+phases = {'inner': 0.0, 'wait': 0.0, 'ghosts': 0.0}
 evolutions = 0
 timetotal0 = time.clock()
 while DISPLAY.loop_running() and evolutions < EVOLUTIONS:
@@ -102,117 +114,67 @@ while DISPLAY.loop_running() and evolutions < EVOLUTIONS:
 	# Calc index to swap textures
 	ti = (ti+1) % 2 
 
-	# img <- read in image from OpenGL buffer
-	pi3d.opengles.glReadPixels(0, 0, WIDTH, HEIGHT, GL_RGB, GL_UNSIGNED_BYTE, 
-			ctypes.byref(img))# can you do a python slice? Will make border calculation easy
-
-	# Turn buffer img array ctype into a PIL 
-	timeim0 = time.clock()
-	# look this up
-	im = Image.frombuffer('RGB', (WIDTH, HEIGHT), img, 'raw', 'RGB', 0, 1)
-	timeim1 = time.clock()
-
-	#Turn PIL into a numpy matrix
-	timearr0 = time.clock()
-	arr = numpy.array(im)
-	timearr1 = time.clock()
-	
-	# Assign and Send it's edges
-	my_top = arr[0]
-	my_bot = arr[len(arr[0][0])]
-	my_lef = arr[:,0]
-	my_rig = arr[:,len(arr[0])-1]
-	
-	timesend0 = time.clock()
-
-	if nprocs > 8:
-		top_rank = nb['t']
-		bot_rank = nb['b']
-		lef_rank = nb['l']
-		rig_rank = nb['r']
-		comm.send(my_top, dest=top_rank, tag=rank+top_rank)
-		comm.send(my_bot, dest=bot_rank, tag=rank+bot_rank)
-		comm.send(my_lef, dest=lef_rank, tag=rank+lef_rank)
-		comm.send(my_rig, dest=rig_rank, tag=rank+rig_rank)
-	elif nprocs == 1:
-		top_rank = 0
-		bot_rank = 0
-		lef_rank = 0
-		rig_rank = 0
-		comm.send(my_top, dest=top_rank, tag=0)
-		comm.send(my_bot, dest=bot_rank, tag=1)
-		comm.send(my_lef, dest=lef_rank, tag=2)
-		comm.send(my_rig, dest=rig_rank, tag=3)
-
-	# Assign and Send it's corners
-	my_tlf = arr[0][0]
-	my_trt = arr[0][len(my_top)-1]
-	my_blf = arr[len(my_lef)-1][0]
-	my_brt = arr[len(my_lef)-1][len(my_top)-1]
-	
-	if nprocs > 8:
-		tlf_rank = nb['tl']
-		trt_rank = nb['tr']
-		blf_rank = nb['bl']
-		brt_rank = nb['br']
-		comm.send(my_tlf, dest=tlf_rank, tag=rank+tlf_rank)
-		comm.send(my_trt, dest=trt_rank, tag=rank+trt_rank)
-		comm.send(my_blf, dest=blf_rank, tag=rank+blf_rank)
-		comm.send(my_brt, dest=brt_rank, tag=rank+brt_rank)
-	elif nprocs == 1:
-		tlf_rank = 0
-		trt_rank= 0
-		blf_rank = 0
-		brt_rank = 0
-		comm.send(my_tlf, dest=top_rank, tag=4)
-		comm.send(my_trt, dest=bot_rank, tag=5)
-		comm.send(my_blf, dest=lef_rank, tag=6)
-		comm.send(my_brt, dest=rig_rank, tag=7)
-
-	timesend1 = time.clock()
-	# Receive edges and apply them to matrix
-	timerecv0 = time.clock()
-	
-	if nprocs > 8:
-		arr[0] = comm.recv(source=top_rank, tag=rank*top_rank)
-		arr[len(arr[0][0])]= comm.recv(source=bot_rank, tag=rank*bot_rank)
-		arr[:,0] = comm.recv(source=lef_rank, tag=rank*lef_rank)
-		arr[:,len(arr[0])-1] = comm.recv(source=rig_rank, tag=rank*rig_rank)
-	elif nprocs == 1:
-		arr[0] = comm.recv(source=top_rank, tag=0)
-		arr[len(arr[0][0])]= comm.recv(source=bot_rank, tag=1)
-		arr[:,0] = comm.recv(source=lef_rank, tag=2)
-		arr[:,len(arr[0])-1] = comm.recv(source=rig_rank, tag=3)
-
-	# Receive corners and apply them to matrix
-	if nprocs > 8:
-		arr[0][0] = comm.recv(source=tlf_rank, tag=rank*tlf_rank)
-		arr[0][len(my_top)-1] = comm.recv(source=trt_rank, tag=rank*trt_rank)
-		arr[len(my_lef)-1][0] = comm.recv(source=blf_rank, tag=rank*blf_rank)
-		arr[len(my_lef)-1][len(my_top)-1] = comm.recv(source=brt_rank, tag=rank*brt_rank)
-	elif nprocs == 1:
-		arr[0][0] = comm.recv(source=tlf_rank, tag=4)
-		arr[0][len(my_top)-1] = comm.recv(source=trt_rank, tag=5)
-		arr[len(my_lef)-1][0] = comm.recv(source=blf_rank, tag=6)
-		arr[len(my_lef)-1][len(my_top)-1] = comm.recv(source=brt_rank, tag=7)
-	
-	timerecv1 = time.clock()
-	
-	# Matrix to ctype char array for buf, then back to GPU
-	timerecon0 = time.clock()
-	img = numpy_pil_to_buf(arr, WIDTH, HEIGHT)
-	timerecon1 = time.clock()
-
-	#print "buf to PIL: "+str(timeim1-timeim0)+" PIL to Numpy: "+str(timearr1-timearr0)+\
-	# " MPI send:"+str(timesend1-timesend0)+" MPI recv: "+str(timerecv1-timerecv0)+\
-	# " Reconstruct: "+str(timerecon1-timerecon0)
-
-	# Tell OpenGL to use the swapped texture
-	pi3d.opengles.glBindTexture(GL_TEXTURE_2D, tex[ti]._tex)
-
-	# Give OpenGL the picture params and the last image (img) 	
-	pi3d.opengles.glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, WIDTH, HEIGHT, 0, GL_RGB,
-			GL_UNSIGNED_BYTE, img)
+	if (evolutions + 1) % DEPTH:
+		# the ghosts are still good for the next generation, copy the image
+		# into the swapped texture without it leaving the GPU
+		halo.copy(tex[ti])
+	elif HALO:
+		# only the border strips come back from the GPU, the interior is
+		# copied into the swapped texture on the GPU and the ghosts written
+		# over it
+		timeim0 = time.clock()
+		halo.read()
+		timeim1 = time.clock()
+		if OVERLAP:
+			# the copy is only queued, the GPU does it during the exchange
+			t0 = time.time()
+			halo.copy(tex[ti])
+			t1 = time.time()
+			exchange_halo(halo, nb, top, bot)
+			t2 = time.time()
+			halo.upload_ghosts(tex[ti])
+			t3 = time.time()
+			phases['inner'] += t1 - t0
+			phases['wait'] += t2 - t1
+			phases['ghosts'] += t3 - t2
+		else:
+			exchange_halo(halo, nb, top, bot)
+			halo.upload(tex[ti])
+	else:
+		# arr <- read in image from OpenGL buffer
+		timeim0 = time.clock()
+		pixels.read()
+		timeim1 = time.clock()
+
+		if OVERLAP:
+			# send the borders, upload the whole image (stale ghosts and all)
+			# while they are in flight, then write in the ghosts received
+			t0 = time.time()
+			reqs = exchange.start()
+			pixels.upload(tex[ti])
+			t1 = time.time()
+			exchange.finish(reqs)
+			t2 = time.time()
+			k = DEPTH
+			halo.ghosts['l'][:] = arr[k:-k, :k]
+			halo.ghosts['r'][:] = arr[k:-k, -k:]
+			halo.ghosts['b'][:] = arr[:k]
+			halo.ghosts['t'][:] = arr[-k:]
+			halo.upload_ghosts(tex[ti])
+			t3 = time.time()
+			phases['inner'] += t1 - t0
+			phases['wait'] += t2 - t1
+			phases['ghosts'] += t3 - t2
+		else:
+			# swap the borders with the neighbours, straight in and out of arr
+			timesend0 = time.clock()
+			exchange.exchange()
+			timesend1 = time.clock()
+
+			#print "glReadPixels: "+str(timeim1-timeim0)+" MPI halo: "+str(timesend1-timesend0)
+
+			# Give OpenGL the edited image in the swapped texture
+			pixels.upload(tex[ti])
 
 	# Apply the shader to the swapped texture
 	sprite.set_draw_details(shader, [tex[ti]])
@@ -220,6 +182,14 @@ while DISPLAY.loop_running() and evolutions < EVOLUTIONS:
 
 timetotal1 = time.clock()
 print "Time for "+str(EVOLUTIONS)+" number of evolutions was: "+str(timetotal1-timetotal0)
+if COMPRESS:
+	encoders = [c[0] for c in codecs.values()] if HALO else exchange.encoders.values()
+	raw = sum(e.raw_bytes for e in encoders)
+	coded = sum(e.coded_bytes for e in encoders)
+	print "Halo: %d bytes sent as %d (%.1fx smaller)" % (raw, coded, float(raw) / max(coded, 1))
+if OVERLAP:
+	print "Overlap: interior upload %f s (exchange hidden), waiting %f s, ghosts %f s" % (
+			phases['inner'], phases['wait'], phases['ghosts'])
 #open("/export/home/akissing/strongtime_hybrid/strongtime"+str(nprocs)+"on"+str(WIDTH*nprocs)+"x"+
 #str(HEIGHT*nprocs)+".txt", "a")\
 #.write(str(rank)+'\t'+str(timetotal1-timetotal0)+'\n')
@@ -0,0 +1,185 @@
+""" Bit packed Life engine, 64 cells to every uint64 word.
+Each row of the world is stored as a row of words with bit b of the row
+holding column i == b of Life.h, so bit 0 and bit ncols+1 are the left and
+right ghost cells and rows 0 and nrows+1 are the top and bottom ghost rows,
+the same layout copy_bounds() fills in. Neighbours are counted for 64 cells
+at a time with half and full adders built from &, | and ^ on whole NumPy
+arrays, giving the count as four bit planes (1, 2, 4 and 8) which are then
+matched against the rules from life_common.
+"""
+import numpy
+
+from life_common import INIT_PROB, next_state, read_grid, write_grid, random_cells
+
+BITS = 64
+ONE = numpy.uint64(1)
+TOP_BIT = numpy.uint64(BITS - 1)
+
+
+def _adder(a, b, c):
+  """ full adder on three bit planes, returns (sum, carry) """
+  t = a ^ b
+  return t ^ c, (a & b) | (c & t)
+
+
+class BitLife(object):
+  def __init__(self, ncols, nrows):
+    self.ncols = ncols
+    self.nrows = nrows
+    self.generation = 0
+    self.nwords = (ncols + 2 + BITS - 1) // BITS
+    self.grid = numpy.zeros((nrows + 2, self.nwords), dtype=numpy.uint64)
+    # ones over the real cells of a row, zero over ghosts and spare bits
+    bits = numpy.zeros(self.nwords * BITS, dtype=numpy.uint8)
+    bits[1:ncols + 1] = 1
+    self._inside = self._pack(bits.reshape(1, -1))[0]
+    # (neighbours, needs_alive) pairs that produce a live cell, needs_alive
+    # is True for survival only, False for birth only and None for both
+    self._terms = []
+    for n in range(9):
+      born, survive = next_state(False, n), next_state(True, n)
+      if born and survive:
+        self._terms.append((n, None))
+      elif survive:
+        self._terms.append((n, True))
+      elif born:
+        self._terms.append((n, False))
+
+  @staticmethod
+  def _pack(bits):
+    """ (rows, nwords * 64) array of 0/1 to (rows, nwords) uint64 array,
+    column b going to bit b % 64 of word b // 64
+    """
+    rows = bits.shape[0]
+    little = numpy.ascontiguousarray(bits.reshape(rows, -1, 8)[:, :, ::-1])
+    packed = numpy.packbits(little, axis=-1).reshape(rows, -1)
+    return packed.view('<u8').astype(numpy.uint64)
+
+  @staticmethod
+  def _unpack(words):
+    """ inverse of _pack() """
+    rows = words.shape[0]
+    raw = numpy.ascontiguousarray(words.astype('<u8')).view(numpy.uint8)
+    bits = numpy.unpackbits(raw.reshape(rows, -1, 1), axis=-1)
+    return bits[:, :, ::-1].reshape(rows, -1)
+
+  @classmethod
+  def from_file(cls, filename):
+    """ load a .in file exactly as init_grids() does """
+    ncols, nrows, cells = read_grid(filename)
+    life = cls(ncols, nrows)
+    for i, j in cells:
+      life.grid[j, i // BITS] |= ONE << numpy.uint64(i % BITS)
+    return life
+
+  @classmethod
+  def from_array(cls, cells):
+    """ build from an (nrows, ncols) array of 0/1 """
+    nrows, ncols = cells.shape
+    life = cls(ncols, nrows)
+    life.set_cells(cells)
+    return life
+
+  @classmethod
+  def random(cls, ncols, nrows, prob=INIT_PROB, seed=None):
+    """ equivalent of randomize_grid() """
+    return cls.from_array(random_cells(ncols, nrows, prob, seed))
+
+  def set_cells(self, cells):
+    bits = numpy.zeros((self.nrows, self.nwords * BITS), dtype=numpy.uint8)
+    bits[:, 1:self.ncols + 1] = cells != 0
+    self.grid[1:-1] = self._pack(bits)
+
+  def to_array(self):
+    """ (nrows, ncols) uint8 array of the real cells """
+    return self._unpack(self.grid[1:-1])[:, 1:self.ncols + 1]
+
+  def _get_column(self, i):
+    return (self.grid[1:-1, i // BITS] >> numpy.uint64(i % BITS)) & ONE
+
+  def _set_column(self, i, bits):
+    shift = numpy.uint64(i % BITS)
+    word = self.grid[1:-1, i // BITS]
+    word &= ~(ONE << shift)
+    word |= bits << shift
+
+  def copy_bounds(self):
+    """ periodic boundaries, sides first then top and bottom including the
+    corners, as copy_bounds() does for a single process
+    """
+    ncols = self.ncols
+    self._set_column(0, self._get_column(ncols))
+    self._set_column(ncols + 1, self._get_column(1))
+    self.grid[0] = self.grid[-2]
+    self.grid[-1] = self.grid[1]
+
+  def eval_rules(self):
+    g = self.grid
+    # west and east neighbour planes of every row, carrying across words
+    west = g << ONE
+    west[:, 1:] |= g[:, :-1] >> TOP_BIT
+    east = g >> ONE
+    east[:, :-1] |= g[:, 1:] << TOP_BIT
+
+    # horizontal sums: h (west + centre + east) for the rows above and below
+    # and m (west + east) for the row itself, each as two bit planes
+    t = west ^ east
+    m1 = west & east
+    h0 = t ^ g
+    h1 = m1 | (g & t)
+    m0 = t[1:-1]
+    m1 = m1[1:-1]
+
+    # add up the three rows to get the neighbour count in bits n0..n3
+    n0, c1 = _adder(h0[:-2], m0, h0[2:])
+    s1, k1 = _adder(h1[:-2], m1, h1[2:])
+    n1 = s1 ^ c1
+    k2 = s1 & c1
+    n2 = k1 ^ k2
+    n3 = k1 & k2
+
+    alive = g[1:-1]
+    new = numpy.zeros_like(alive)
+    for n, needs_alive in self._terms:
+      match = self._count_is(n, (n0, n1, n2), n3)
+      if needs_alive is True:
+        match &= alive
+      elif needs_alive is False:
+        match &= ~alive
+      new |= match
+    new &= self._inside
+    g[1:-1] = new
+
+  @staticmethod
+  def _count_is(n, planes, n3):
+    """ mask of the cells whose neighbour count is n. n3 is only ever set
+    for a count of 8, when the low planes are all clear, so it only needs
+    looking at for 0 and 8
+    """
+    if n == 8:
+      return n3.copy()
+    if n == 0:
+      return ~(planes[0] | planes[1] | planes[2] | n3)
+    match = None
+    for bit, plane in enumerate(planes):
+      term = plane if (n >> bit) & 1 else ~plane
+      match = term if match is None else match & term
+    return match
+
+  def step(self, generations=1):
+    for _ in range(generations):
+      self.copy_bounds()
+      self.eval_rules()
+      self.generation += 1
+
+  def population(self):
+    cells = self.grid[1:-1] & self._inside
+    return int(numpy.unpackbits(cells.view(numpy.uint8)).sum())
+
+  def live_cells(self):
+    """ list of (i, j) in the 1-based numbering used by the .in files """
+    rows, cols = numpy.nonzero(self.to_array())
+    return list(zip((cols + 1).tolist(), (rows + 1).tolist()))
+
+  def write(self, filename):
+    write_grid(filename, self.ncols, self.nrows, self.live_cells())
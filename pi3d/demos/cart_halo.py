@@ -0,0 +1,96 @@
+""" 2D domain decomposition for the MPI versions, the general form of
+get_neighbors.py. The ranks are laid out as a periodic MPI Cartesian grid
+(MPI.Compute_dims picks the shape) with rows of tiles counting upwards, see
+tile_grid.py.
+
+Each rank's part of the world is a padded array whose outer ring of cells,
+depth cells deep, are ghosts, copies of the neighbours' borders. With a
+depth of k the ghosts stay good for k generations, the outer layer going
+stale every generation, so they only need swapping every k generations,
+for a little repeated work on the ghosts. HaloExchange swaps the eight
+borders (four edges and four corners) with the neighbours through
+preallocated contiguous buffers and the buffer interface of mpi4py, so a
+halo costs one copy in and one copy out plus the raw bytes on the wire.
+With compress=True the borders go through a halo_codec.HaloCodec instead,
+for slow links.
+"""
+import numpy
+from mpi4py import MPI
+
+from halo_codec import HaloCodec
+
+from tile_grid import DIRECTIONS, OPPOSITE, extent, neighbors, strip
+
+# a message is tagged with the direction it travels in
+TAGS = dict((d, tag) for tag, d in enumerate(sorted(DIRECTIONS)))
+
+
+def cart_grid(comm):
+  """ periodic 2D Cartesian communicator over every rank of comm. The ranks
+  keep their order, so rank r has the tile run.py placed it for
+  """
+  dims = MPI.Compute_dims(comm.Get_size(), 2)
+  return comm.Create_cart(dims, periods=[True, True], reorder=False)
+
+
+class HaloExchange(object):
+  def __init__(self, cart, grid, depth=1, compress=False):
+    """ grid is the padded local array, (rows, columns, ...) with rows
+    counting upwards and depth ghost cells round it. It is bound here and
+    must stay the same array
+    """
+    self.cart = cart
+    self.grid = grid
+    self.depth = depth
+    self.compress = compress
+    self.nb = neighbors(cart)
+    rows, cols = grid.shape[:2]
+    self.border = {}
+    self.ghost = {}
+    self.send = {}
+    self.recv = {}
+    self.encoders = {}
+    self.decoders = {}
+    for d, (dy, dx) in DIRECTIONS.items():
+      self.border[d] = (strip(rows, dy, False, depth),
+                        strip(cols, dx, False, depth))
+      self.ghost[d] = (strip(rows, dy, True, depth),
+                       strip(cols, dx, True, depth))
+      if compress:
+        self.encoders[d] = HaloCodec(grid[self.border[d]].shape)
+        self.decoders[d] = HaloCodec(grid[self.ghost[d]].shape)
+        self.recv[d] = numpy.empty(self.decoders[d].size, dtype=numpy.uint8)
+      else:
+        self.send[d] = numpy.empty_like(grid[self.border[d]])
+        self.recv[d] = numpy.empty_like(grid[self.ghost[d]])
+    self.statuses = [MPI.Status() for _ in DIRECTIONS]
+
+  def start(self):
+    """ pack the borders and post the messages, returns the requests """
+    reqs = []
+    for d in DIRECTIONS:
+      # the neighbour in direction d sent its border towards us
+      reqs.append(self.cart.Irecv(self.recv[d], source=self.nb[d],
+                                  tag=TAGS[OPPOSITE[d]]))
+    for d in DIRECTIONS:
+      if self.compress:
+        self.send[d] = self.encoders[d].encode(self.grid[self.border[d]])
+      else:
+        self.send[d][...] = self.grid[self.border[d]]
+      reqs.append(self.cart.Isend(self.send[d], dest=self.nb[d], tag=TAGS[d]))
+    return reqs
+
+  def finish(self, reqs):
+    """ wait for the messages and unpack them into the ghosts """
+    # the receives come first in reqs, one for each direction
+    MPI.Request.Waitall(reqs[:len(DIRECTIONS)], self.statuses)
+    MPI.Request.Waitall(reqs[len(DIRECTIONS):])
+    for d, status in zip(DIRECTIONS, self.statuses):
+      if self.compress:
+        count = status.Get_count(MPI.BYTE)
+        self.decoders[d].decode(self.recv[d][:count], self.grid[self.ghost[d]])
+      else:
+        self.grid[self.ghost[d]] = self.recv[d]
+
+  def exchange(self):
+    self.finish(self.start())
@@ -0,0 +1,146 @@
+""" Checks of the halo code that needs neither a GPU nor MPI, run from
+pi3d/demos with python check_halos.py. Exits with an AssertionError at the
+first thing that comes out wrong. The socket transports are run with every
+rank a process on this host, listening on localhost from PORT.
+"""
+import multiprocessing
+import traceback
+
+import numpy
+
+from halo_codec import PACKED, RUNS, XOR_RUNS, HaloCodec
+from socket_grid import AsyncSocketGrid, SocketGrid
+
+PORT = 20100
+# (rows, columns) of ranks for a column, a row and a grid of tiles
+LAYOUTS = ((1, 3), (3, 1), (2, 2))
+# interior cells of a tile and ghost rings
+TILE = (12, 16)
+DEPTH = 2
+
+
+def check_codec():
+  """ send strips of cells and of pixels through a pair of codecs, one
+  coming out each of the three ways, and check they decode to what went in.
+  The strips go one after the other, as on a link, so the XOR runs are
+  decoded against the strip before
+  """
+  rng = numpy.random.RandomState(0)
+  soup = (rng.random_sample((2, 128)) < 0.5).astype(numpy.uint8)
+  # soup is too busy for runs, soup again hasn't changed since the last
+  # strip and nothing alive is a single run
+  strips = ((soup, PACKED), (soup, XOR_RUNS), (numpy.zeros_like(soup), RUNS))
+  for pixels in (False, True):
+    shape = soup.shape + (3,) if pixels else soup.shape
+    sender, receiver = HaloCodec(shape), HaloCodec(shape)
+    for cells, way in strips:
+      strip = numpy.zeros(shape, dtype=numpy.uint8)
+      if pixels:
+        strip[..., 2] = cells * 255
+      else:
+        strip[...] = cells
+      data = sender.encode(strip)
+      assert data[0] == way, 'strip encoded as %d, not %d' % (data[0], way)
+      decoded = numpy.empty_like(strip)
+      receiver.decode(data, decoded)
+      assert (decoded == strip).all(), 'strip encoded as %d decoded wrong' % way
+
+
+class StubHalo(object):
+  """ the edges, ghosts and depth of a pi3d.Halo, on a padded tile of
+  pixels in memory instead of a framebuffer
+  """
+  def __init__(self, tile, depth):
+    h, w, channels = tile.shape
+    d = self.depth = depth
+    self.edges = {'l': tile[d:h - d, d:2 * d], 'r': tile[d:h - d, w - 2 * d:w - d],
+                  'b': tile[d:2 * d, d:w - d], 't': tile[h - 2 * d:h - d, d:w - d]}
+    self.ghosts = {'l': numpy.zeros((h - 2 * d, d, channels), dtype=numpy.uint8),
+                   'r': numpy.zeros((h - 2 * d, d, channels), dtype=numpy.uint8),
+                   'b': numpy.zeros((d, w, channels), dtype=numpy.uint8),
+                   't': numpy.zeros((d, w, channels), dtype=numpy.uint8)}
+
+
+def _worlds(dims):
+  """ the worlds exchanged one after the other, pixels live in blue: a soup,
+  the same soup again and nothing alive, so a compressed strip goes every
+  way a HaloCodec has
+  """
+  rng = numpy.random.RandomState(1)
+  shape = (dims[0] * TILE[0], dims[1] * TILE[1], 3)
+  soup = numpy.zeros(shape, dtype=numpy.uint8)
+  soup[..., 2] = (rng.random_sample(shape[:2]) < 0.5) * 255
+  return soup, soup, numpy.zeros(shape, dtype=numpy.uint8)
+
+
+def _padded(world, dims, coords):
+  """ tile coords of the periodic world with its ring of ghosts, as the
+  single process reference
+  """
+  (ny, nx), (y, x), (h, w) = dims, coords, TILE
+  rows = numpy.arange(y * h - DEPTH, (y + 1) * h + DEPTH)
+  cols = numpy.arange(x * w - DEPTH, (x + 1) * w + DEPTH)
+  return world.take(rows, axis=0, mode='wrap').take(cols, axis=1, mode='wrap')
+
+
+def _rank(transport, dims, rank, port, compress, results):
+  """ one rank: swap the halos of each of the worlds, sending back the
+  ghosts that came in, or the error
+  """
+  try:
+    grid = transport(['localhost'] * (dims[0] * dims[1]), rank, port, dims,
+                     compress)
+    ghosts = []
+    for world in _worlds(dims):
+      tile = _padded(world, dims, grid.coords)
+      # only the edges are the tile's own, the ghosts have to come in
+      tile[:DEPTH], tile[-DEPTH:] = 0, 0
+      tile[:, :DEPTH], tile[:, -DEPTH:] = 0, 0
+      halo = StubHalo(tile, DEPTH)
+      grid.exchange(halo)
+      ghosts.append(dict((k, v.copy()) for k, v in halo.ghosts.items()))
+    grid.close()
+    results.put((rank, grid.coords, ghosts))
+  except Exception:
+    results.put((rank, None, traceback.format_exc()))
+
+
+def check_transport(transport, dims, port, compress):
+  """ run a rank of transport for every tile of dims and check each one's
+  ghosts against the tile cut out of the whole world
+  """
+  size = dims[0] * dims[1]
+  results = multiprocessing.Queue()
+  procs = [multiprocessing.Process(target=_rank,
+                                   args=(transport, dims, r, port, compress, results))
+           for r in range(size)]
+  for proc in procs:
+    proc.start()
+  # empty the queue before joining, a process can't exit with data unsent
+  got = [results.get(timeout=60) for _ in procs]
+  for proc in procs:
+    proc.join()
+  name = '%s %dx%d%s' % (transport.__name__, dims[0], dims[1],
+                         ' compressed' if compress else '')
+  d = DEPTH
+  for rank, coords, ghosts in got:
+    assert coords is not None, '%s rank %d failed\n%s' % (name, rank, ghosts)
+    for world, ghost in zip(_worlds(dims), ghosts):
+      want = _padded(world, dims, coords)
+      expected = {'l': want[d:-d, :d], 'r': want[d:-d, -d:],
+                  'b': want[:d], 't': want[-d:]}
+      for side in expected:
+        assert (ghost[side] == expected[side]).all(), \
+            '%s rank %d got the wrong %s ghosts' % (name, rank, side)
+
+
+if __name__ == '__main__':
+  check_codec()
+  port = PORT
+  for transport in (SocketGrid, AsyncSocketGrid):
+    for dims in LAYOUTS:
+      for compress in (False, True):
+        check_transport(transport, dims, port, compress)
+        # a fresh port each time, the last may still be in TIME_WAIT
+        port += 1
+  print('ok')
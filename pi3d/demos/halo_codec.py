@@ -0,0 +1,94 @@
+""" Codec for halo strips on slow links. All the neighbours need of a cell
+is whether it is alive, so a strip can go as bits, 8 cells to a byte, 24
+times fewer bytes than the RGB pixels of the GPU versions. When few cells
+are alive, or few have changed since the last strip, the lengths of the
+runs of the same state are shorter still, so each strip is sent whichever
+of three ways comes out smallest: packed bits, runs of the cells or runs of
+their XOR with the last strip sent. The choice is made strip by strip from
+the measured density of changes along it, the number of runs, which is all
+the size of a run encoding depends on.
+
+An encoded strip is one byte for the way it was encoded followed by the
+data, at most 1 + (n + 7) // 8 bytes for n cells. Both ends keep the last
+strip, so a codec must be used for one direction of one link only, one at
+the sending end and one at the receiving end.
+"""
+import numpy
+
+# the ways of encoding a strip
+PACKED = 0
+RUNS = 1
+XOR_RUNS = 2
+# a pixel is alive to the shader when blue >= 0.25, see shaders/conway.fs
+ALIVE_BLUE = 64
+
+
+class HaloCodec(object):
+  def __init__(self, shape):
+    """ codec for strips of shape, (rows, columns) of 0 or 1 cells or
+    (rows, columns, channels) of pixels as the GPU has them
+    """
+    self.shape = tuple(shape)
+    self.pixels = len(self.shape) == 3
+    self.n = self.shape[0] * self.shape[1]
+    self.size = 1 + (self.n + 7) // 8
+    self._runs = numpy.dtype('<u2' if self.n < 1 << 16 else '<u4')
+    self._last = numpy.zeros(self.n, dtype=bool)
+    # bytes of the strips as they are and as they were sent
+    self.raw_bytes = 0
+    self.coded_bytes = 0
+
+  def _cells(self, strip):
+    if self.pixels:
+      return (strip[..., 2] >= ALIVE_BLUE).ravel()
+    return (strip != 0).ravel()
+
+  def _run_lengths(self, bits):
+    starts = numpy.flatnonzero(bits[1:] != bits[:-1]) + 1
+    return numpy.diff(numpy.concatenate(([0], starts, [self.n])))
+
+  def encode(self, strip):
+    """ uint8 array of the encoded strip """
+    cells = self._cells(strip)
+    changes = cells ^ self._last
+    self._last = cells
+    # runs are 1 + the number of places the state changes along the strip
+    packed_size = self.size
+    cell_runs = 1 + numpy.count_nonzero(cells[1:] != cells[:-1])
+    change_runs = 1 + numpy.count_nonzero(changes[1:] != changes[:-1])
+    runs_size = 2 + self._runs.itemsize * min(cell_runs, change_runs)
+    if runs_size < packed_size:
+      way, bits = (RUNS, cells) if cell_runs <= change_runs else (XOR_RUNS, changes)
+      lengths = self._run_lengths(bits).astype(self._runs)
+      data = numpy.empty(2 + lengths.nbytes, dtype=numpy.uint8)
+      data[1] = bits[0]
+      data[2:] = lengths.view(numpy.uint8)
+    else:
+      way = PACKED
+      data = numpy.empty(packed_size, dtype=numpy.uint8)
+      data[1:] = numpy.packbits(cells)
+    data[0] = way
+    self.raw_bytes += strip.nbytes
+    self.coded_bytes += data.nbytes
+    return data
+
+  def decode(self, data, strip):
+    """ write the cells of the encoded strip data into strip, live pixels
+    as blue and dead ones as black
+    """
+    way = data[0]
+    if way == PACKED:
+      cells = numpy.unpackbits(data[1:])[:self.n].astype(bool)
+    else:
+      lengths = numpy.frombuffer(data[2:].tobytes(), dtype=self._runs)
+      states = (data[1] + numpy.arange(len(lengths))) % 2
+      cells = numpy.repeat(states.astype(bool), lengths)
+      if way == XOR_RUNS:
+        cells ^= self._last
+    self._last = cells
+    cells = cells.reshape(self.shape[:2])
+    if self.pixels:
+      strip[...] = 0
+      strip[..., 2] = cells * 255
+    else:
+      strip[...] = cells
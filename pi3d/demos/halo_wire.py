@@ -0,0 +1,99 @@
+""" Binary framing for sending halo strips over a stream socket, used by
+socket_conway.py. A message is a fixed header, the generation, the edge the
+strip was taken from and the length of the payload, followed by the raw
+uint8 cells, so nothing is pickled and the receiver always knows how many
+bytes to wait for. Header and payload share one preallocated buffer, sent
+with a single sendall() and filled with recv_into(), so the hot loop
+allocates nothing and the cells are copied once on the way in and once on
+the way out.
+
+A compressed Frame sends the strip through a halo_codec.HaloCodec instead,
+so its payload varies in length and the header is read first to find out
+how much follows.
+"""
+import struct
+
+import numpy
+
+from halo_codec import HaloCodec
+
+# generation, edge, payload length in bytes
+HEADER = struct.Struct('!IBI')
+# edge ids on the wire, named as in get_neighbors.py
+EDGES = ('l', 'r', 'b', 't', 'bl', 'br', 'tl', 'tr')
+
+
+class Frame(object):
+  def __init__(self, shape, compress=False):
+    """ one message of a strip of the given shape. array is a numpy array
+    of the strip: fill it before send(), read it after recv()
+    """
+    self.codec = HaloCodec(shape) if compress else None
+    capacity = self.codec.size if compress else int(numpy.prod(shape))
+    self.buf = bytearray(HEADER.size + capacity)
+    self.view = memoryview(self.buf)
+    payload = numpy.frombuffer(self.buf, dtype=numpy.uint8, offset=HEADER.size)
+    if compress:
+      self.payload = payload
+      self.array = numpy.zeros(shape, dtype=numpy.uint8)
+    else:
+      self.array = payload.reshape(shape)
+
+  def pack(self, generation, edge):
+    """ write the header, and the encoded strip when compressing, returns
+    the whole message ready to go
+    """
+    length = len(self.buf) - HEADER.size
+    if self.codec:
+      data = self.codec.encode(self.array)
+      length = len(data)
+      self.payload[:length] = data
+    HEADER.pack_into(self.buf, 0, generation, EDGES.index(edge), length)
+    return self.view[:HEADER.size + length]
+
+  def _end(self, got):
+    """ length of the message coming in, as far as can be told from the
+    first got bytes of it
+    """
+    if not self.codec:
+      return len(self.buf)
+    if got < HEADER.size:
+      return HEADER.size
+    return HEADER.size + min(HEADER.unpack_from(self.buf)[2],
+                             len(self.buf) - HEADER.size)
+
+  def recv_some(self, sock, got):
+    """ read whatever more of the message has arrived, got bytes of it
+    having come already, without reading past its end. Returns the number
+    of bytes now in and whether that is all of it
+    """
+    n = sock.recv_into(self.view[got:self._end(got)])
+    if n == 0:
+      raise EOFError('connection closed part way through a halo')
+    got += n
+    return got, got >= HEADER.size and got == self._end(got)
+
+  def check(self, generation, edge):
+    """ check the message just received is the strip expected, returns the
+    strip
+    """
+    header = HEADER.unpack_from(self.buf)
+    capacity = len(self.buf) - HEADER.size
+    length = header[2] if self.codec and header[2] <= capacity else capacity
+    expected = (generation, EDGES.index(edge), length)
+    if header != expected:
+      raise ValueError('expected halo (generation, edge, length) %s, got %s'
+                       % (expected, header))
+    if self.codec:
+      self.codec.decode(self.payload[:length], self.array)
+    return self.array
+
+  def send(self, sock, generation, edge):
+    sock.sendall(self.pack(generation, edge))
+
+  def recv(self, sock, generation, edge):
+    """ wait for the whole of the next message, see check() """
+    got, done = 0, False
+    while not done:
+      got, done = self.recv_some(sock, got)
+    return self.check(generation, edge)
@@ -0,0 +1,343 @@
+""" HashLife engine, jumps the world forward by powers of two generations.
+The world is a canonical quadtree: every node is made once for a given
+set of four children and looked up again through a hash table, and the
+result of advancing a node (the centre half, 2**j generations on) is
+memoised, so repeated structure in space and time is only worked out once.
+
+Both tables are LRU caches with a cap on their memory use so a long run
+can't eat the whole of a Pi's RAM. Evicting a node only costs sharing, the
+tree still referenced by the world is never freed and the answers are
+unchanged.
+
+The world is the unbounded plane, with the .in file's cells placed at
+their coordinates, so patterns that run into the edge of the C engine's
+world keep going here instead of wrapping round. Set wrap to get exactly
+the torus of copy_bounds() in Life.h instead: a torus of ncols x nrows is the
+infinite plane tiled with copies of it, so each jump builds a quadtree over
+a window of that tiling (a node only depends on where it starts modulo the
+world size) and reads the torus back out of the centre of the result. That
+is much slower, the offsets multiply the distinct nodes, and only pays off
+once the torus settles down.
+"""
+import numpy
+
+from life_common import INIT_PROB, next_state, read_grid, write_grid, random_cells
+
+# rough bytes used by one cache entry, a node with its key tuple and dict slot
+ENTRY_BYTES = 320
+DEFAULT_CACHE_MB = 256
+
+
+class Node(object):
+  """ square of 2**level cells, made of four quadrants of the level below """
+  __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+  def __init__(self, nw, ne, sw, se, level, population):
+    self.nw = nw
+    self.ne = ne
+    self.sw = sw
+    self.se = se
+    self.level = level
+    self.population = population
+
+OFF = Node(None, None, None, None, 0, 0)
+ON = Node(None, None, None, None, 0, 1)
+
+
+class LRUCache(object):
+  """ dict holding at most max_entries items that drops the least recently
+  used ones first. Rather than keep an exact order (far too slow for the
+  millions of lookups a jump makes) it keeps two generations, entries are
+  added to the young one and moved up to it whenever they are used, and when
+  the young one is full the old one is thrown away, so anything dropped has
+  not been used for at least max_entries / 2 insertions
+  """
+  def __init__(self, max_entries):
+    self.max_entries = max(2, max_entries)
+    self._young = {}
+    self._old = {}
+    self.evictions = 0
+
+  def get(self, key):
+    value = self._young.get(key)
+    if value is None:
+      value = self._old.pop(key, None)
+      if value is not None:
+        self.put(key, value)
+    return value
+
+  def put(self, key, value):
+    young = self._young
+    young[key] = value
+    if len(young) >= self.max_entries // 2:
+      self.evictions += len(self._old)
+      self._old = young
+      self._young = {}
+
+  def __len__(self):
+    return len(self._young) + len(self._old)
+
+  def clear(self):
+    self._young.clear()
+    self._old.clear()
+
+
+class HashLife(object):
+  def __init__(self, ncols, nrows, max_mb=DEFAULT_CACHE_MB, wrap=False):
+    self.ncols = ncols
+    self.nrows = nrows
+    self.wrap = wrap
+    self.generation = 0
+    # the memory cap is split evenly between the node and result tables
+    entries = int(max_mb * 2 ** 20 // ENTRY_BYTES // 2)
+    self.nodes = LRUCache(entries)
+    self.results = LRUCache(entries)
+    self._empty = [OFF]
+    # the plane is held as root, whose top left cell is at origin (x, y)
+    # with x = i - 1 and y = j - 1, the torus as a plain array of cells
+    self.root = self.empty(3)
+    self.origin = (0, 0)
+    self.cells = numpy.zeros((nrows, ncols), dtype=numpy.uint8)
+
+  @classmethod
+  def from_file(cls, filename, **kwds):
+    """ load a .in file exactly as init_grids() does """
+    ncols, nrows, cells = read_grid(filename)
+    life = cls(ncols, nrows, **kwds)
+    if life.wrap:
+      for i, j in cells:
+        # cells on the ghost ring would be overwritten by copy_bounds()
+        if 1 <= i <= ncols and 1 <= j <= nrows:
+          life.cells[j - 1, i - 1] = 1
+    else:
+      life.set_cells([(i - 1, j - 1) for i, j in cells])
+    return life
+
+  @classmethod
+  def random(cls, ncols, nrows, prob=INIT_PROB, seed=None, **kwds):
+    """ equivalent of randomize_grid() """
+    life = cls(ncols, nrows, **kwds)
+    cells = random_cells(ncols, nrows, prob, seed)
+    if life.wrap:
+      life.cells[:] = cells
+    else:
+      rows, cols = numpy.nonzero(cells)
+      life.set_cells(zip(cols.tolist(), rows.tolist()))
+    return life
+
+  def set_cells(self, cells):
+    """ make the plane from an iterable of live (x, y) cells """
+    cells = list(set(cells))
+    if not cells:
+      self.root, self.origin = self.empty(3), (0, 0)
+      return
+    x0 = min(x for x, y in cells)
+    y0 = min(y for x, y in cells)
+    size = max(max(x for x, y in cells) - x0, max(y for x, y in cells) - y0)
+    level = 3
+    while (1 << level) <= size:
+      level += 1
+
+    def build(level, x, y, points):
+      if not points:
+        return self.empty(level)
+      if level == 0:
+        return ON
+      half = 1 << (level - 1)
+      quads = ([], [], [], [])
+      for p in points:
+        quads[(p[0] >= x + half) + 2 * (p[1] >= y + half)].append(p)
+      return self.join(build(level - 1, x, y, quads[0]),
+                       build(level - 1, x + half, y, quads[1]),
+                       build(level - 1, x, y + half, quads[2]),
+                       build(level - 1, x + half, y + half, quads[3]))
+
+    self.root, self.origin = build(level, x0, y0, cells), (x0, y0)
+
+  def join(self, nw, ne, sw, se):
+    """ the canonical node with these four quadrants """
+    key = (nw, ne, sw, se)
+    node = self.nodes.get(key)
+    if node is None:
+      node = Node(nw, ne, sw, se, nw.level + 1,
+                  nw.population + ne.population + sw.population + se.population)
+      self.nodes.put(key, node)
+    return node
+
+  def empty(self, level):
+    while len(self._empty) <= level:
+      e = self._empty[-1]
+      self._empty.append(Node(e, e, e, e, e.level + 1, 0))
+    return self._empty[level]
+
+  def _life_4x4(self, m):
+    """ centre 2x2 of a level 2 node after one generation """
+    rows = ((m.nw.nw, m.nw.ne, m.ne.nw, m.ne.ne),
+            (m.nw.sw, m.nw.se, m.ne.sw, m.ne.se),
+            (m.sw.nw, m.sw.ne, m.se.nw, m.se.ne),
+            (m.sw.sw, m.sw.se, m.se.sw, m.se.se))
+    bits = [[c.population for c in row] for row in rows]
+    new = []
+    for y in (1, 2):
+      for x in (1, 2):
+        n = sum(bits[y + dy][x + dx] for dy in (-1, 0, 1)
+                for dx in (-1, 0, 1)) - bits[y][x]
+        new.append(ON if next_state(bits[y][x], n) else OFF)
+    return self.join(*new)
+
+  def successor(self, m, j):
+    """ centre of node m (level k) advanced 2**j generations, j <= k - 2 """
+    if m.population == 0:
+      return self.empty(m.level - 1)
+    j = min(j, m.level - 2)
+    key = (m, j)
+    s = self.results.get(key)
+    if s is not None:
+      return s
+    if m.level == 2:
+      s = self._life_4x4(m)
+    else:
+      join = self.join
+      a, b, c, d = m.nw, m.ne, m.sw, m.se
+      # nine overlapping sub-squares of half the size, each advanced
+      c1 = self.successor(join(a.nw, a.ne, a.sw, a.se), j)
+      c2 = self.successor(join(a.ne, b.nw, a.se, b.sw), j)
+      c3 = self.successor(join(b.nw, b.ne, b.sw, b.se), j)
+      c4 = self.successor(join(a.sw, a.se, c.nw, c.ne), j)
+      c5 = self.successor(join(a.se, b.sw, c.ne, d.nw), j)
+      c6 = self.successor(join(b.sw, b.se, d.nw, d.ne), j)
+      c7 = self.successor(join(c.nw, c.ne, c.sw, c.se), j)
+      c8 = self.successor(join(c.ne, d.nw, c.se, d.sw), j)
+      c9 = self.successor(join(d.nw, d.ne, d.sw, d.se), j)
+      if j < m.level - 2:
+        # only half a step wanted, take the centres without advancing again
+        s = join(join(c1.se, c2.sw, c4.ne, c5.nw),
+                 join(c2.se, c3.sw, c5.ne, c6.nw),
+                 join(c4.se, c5.sw, c7.ne, c8.nw),
+                 join(c5.se, c6.sw, c8.ne, c9.nw))
+      else:
+        s = join(self.successor(join(c1, c2, c4, c5), j),
+                 self.successor(join(c2, c3, c5, c6), j),
+                 self.successor(join(c4, c5, c7, c8), j),
+                 self.successor(join(c5, c6, c8, c9), j))
+    self.results.put(key, s)
+    return s
+
+  def _window(self, level, x0, y0):
+    """ node of the tiled plane with its top left corner at (x0, y0) """
+    ncols, nrows = self.ncols, self.nrows
+    cells = self.cells
+    built = {}
+
+    def build(level, x, y):
+      if level == 0:
+        return ON if cells[y, x] else OFF
+      key = (level, x, y)
+      node = built.get(key)
+      if node is None:
+        half = 1 << (level - 1)
+        x1, y1 = (x + half) % ncols, (y + half) % nrows
+        node = self.join(build(level - 1, x, y), build(level - 1, x1, y),
+                         build(level - 1, x, y1), build(level - 1, x1, y1))
+        built[key] = node
+      return node
+
+    return build(level, x0 % ncols, y0 % nrows)
+
+  def _read_back(self, node):
+    """ fill self.cells from a node whose top left corner is cell (0, 0) """
+    cells = numpy.zeros_like(self.cells)
+    for x, y in self._live(node, 0, 0, self.ncols, self.nrows):
+      cells[y, x] = 1
+    self.cells = cells
+
+  @staticmethod
+  def _live(node, x, y, ncols=None, nrows=None):
+    """ generate the (x, y) of the live cells of node, whose top left corner
+    is at (x, y), optionally only those with x < ncols and y < nrows
+    """
+    stack = [(node, x, y)]
+    while stack:
+      m, x, y = stack.pop()
+      if m.population == 0:
+        continue
+      if ncols is not None and (x >= ncols or y >= nrows):
+        continue
+      if m.level == 0:
+        yield x, y
+        continue
+      half = 1 << (m.level - 1)
+      stack.extend(((m.nw, x, y), (m.ne, x + half, y),
+                    (m.sw, x, y + half), (m.se, x + half, y + half)))
+
+  def _centre(self, m):
+    return self.join(m.nw.se, m.ne.sw, m.sw.ne, m.se.nw)
+
+  def _expand(self):
+    """ put an empty border round the root, doubling its size """
+    m = self.root
+    e = self.empty(m.level - 1)
+    self.root = self.join(self.join(e, e, e, m.nw), self.join(e, e, m.ne, e),
+                          self.join(e, m.sw, e, e), self.join(m.se, e, e, e))
+    half = 1 << (m.level - 1)
+    self.origin = (self.origin[0] - half, self.origin[1] - half)
+
+  def _shrink(self):
+    """ drop empty borders so the root stays as small as the pattern """
+    while self.root.level > 3:
+      centre = self._centre(self.root)
+      if centre.population != self.root.population:
+        break
+      quarter = 1 << (self.root.level - 2)
+      self.root = centre
+      self.origin = (self.origin[0] + quarter, self.origin[1] + quarter)
+
+  def jump(self, j):
+    """ advance exactly 2**j generations """
+    if self.wrap:
+      # the centre of the result (half the width) has to cover the torus
+      level = max(3, j + 2)
+      while (1 << (level - 1)) < max(self.ncols, self.nrows):
+        level += 1
+      quarter = 1 << (level - 2)
+      top = self._window(level, -quarter, -quarter)
+      self._read_back(self.successor(top, j))
+    else:
+      # a pattern in the centre half of a node with level >= j + 2 can't grow
+      # out of the result once given one more empty border
+      while (self.root.level < j + 2 or
+             self._centre(self.root).population != self.root.population):
+        self._expand()
+      self._expand()
+      quarter = 1 << (self.root.level - 2)
+      self.root = self.successor(self.root, j)
+      self.origin = (self.origin[0] + quarter, self.origin[1] + quarter)
+      self._shrink()
+    self.generation += 1 << j
+
+  def step(self, generations=1):
+    """ advance any number of generations, one jump per bit set """
+    j = 0
+    while generations:
+      if generations & 1:
+        self.jump(j)
+      generations >>= 1
+      j += 1
+
+  def population(self):
+    if self.wrap:
+      return int(numpy.count_nonzero(self.cells))
+    return self.root.population
+
+  def live_cells(self):
+    """ list of (i, j) in the 1-based numbering used by the .in files, on
+    the plane these can fall outside the ncols x nrows of the input
+    """
+    if self.wrap:
+      rows, cols = numpy.nonzero(self.cells)
+      return list(zip((cols + 1).tolist(), (rows + 1).tolist()))
+    x0, y0 = self.origin
+    return [(x + 1, y + 1) for x, y in self._live(self.root, x0, y0)]
+
+  def write(self, filename):
+    write_grid(filename, self.ncols, self.nrows, self.live_cells())
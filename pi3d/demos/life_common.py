@@ -0,0 +1,90 @@
+""" Constants and file helpers shared by the headless Life engines.
+The values mirror C_MPI_Implementation/Defaults.h so that every engine
+plays by exactly the same rules as eval_rules() in Life.h, and the file
+helpers read and write the same .in format as init_grids() and life2text,
+and read the grids the C engine writes with --output.
+"""
+import numpy
+
+# start of a grid written by write_grid() in Life.h, see struct life_header
+FILE_MAGIC = b'LIFE'
+
+# Default parameters for the simulation (see Defaults.h)
+DEFAULT_SIZE = 105
+DEFAULT_GENS = 1000
+INIT_PROB = 0.25
+
+# CELL_STATES
+DEAD = 0
+ALIVE = 1
+
+# Cells become DEAD with more than UPPER_THRESH
+# or fewer than LOWER_THRESH neighbors
+UPPER_THRESH = 3
+LOWER_THRESH = 2
+
+# Cells with exactly SPAWN_THRESH neighbors become ALIVE
+SPAWN_THRESH = 3
+
+
+def next_state(alive, neighbors):
+  """ the rule eval_rules() applies to a single cell, returns DEAD or ALIVE
+  """
+  if neighbors < LOWER_THRESH or neighbors > UPPER_THRESH:
+    return DEAD
+  if alive or neighbors == SPAWN_THRESH:
+    return ALIVE
+  return DEAD
+
+
+def rule_table():
+  """ lookup table indexed by 2 * (3x3 block total) + centre cell. The
+  block total includes the centre so the neighbour count is total - centre.
+  Returns a uint8 array of 20 entries
+  """
+  table = numpy.zeros(20, dtype=numpy.uint8)
+  for total in range(10):
+    for alive in (DEAD, ALIVE):
+      if total - alive >= 0:
+        table[2 * total + alive] = next_state(alive, total - alive)
+  return table
+
+
+def read_grid(filename):
+  """ read a Life input file (see C_MPI_Implementation/README.txt), text or
+  a grid written by the C engine's --output
+  returns (ncols, nrows, cells) where cells is a list of (i, j) tuples using
+  the 1-based column, row numbering of init_grids(). As in scatter_cells(),
+  a third number on a line of a text file, the age life2text writes for -a
+  grids, is ignored, as are lines with fewer than two
+  """
+  with open(filename, 'rb') as f:
+    if f.read(len(FILE_MAGIC)) == FILE_MAGIC:
+      ncols, nrows, cell_bytes = numpy.fromfile(f, dtype=numpy.int32, count=3)
+      # a byte a cell, or the ages of the cells as ints, column after column
+      grid = numpy.fromfile(f, dtype=numpy.uint8 if cell_bytes == 1 else numpy.int32)
+      i, j = numpy.nonzero(grid.reshape(ncols, nrows))
+      return int(ncols), int(nrows), list(zip((i + 1).tolist(), (j + 1).tolist()))
+    f.seek(0)
+    lines = [line.split() for line in f]
+  if not lines or len(lines[0]) < 2:
+    raise ValueError('File must at least define grid dimensions!')
+  ncols, nrows = int(lines[0][0]), int(lines[0][1])
+  cells = [(int(v[0]), int(v[1])) for v in lines[1:] if len(v) >= 2]
+  return ncols, nrows, cells
+
+
+def write_grid(filename, ncols, nrows, cells):
+  """ dump live cells in the text format init_grids() in Life.h reads
+  """
+  with open(filename, 'w') as f:
+    f.write('%d %d\n' % (ncols, nrows))
+    for i, j in sorted(cells):
+      f.write('%d %d\n' % (i, j))
+
+
+def random_cells(ncols, nrows, prob=INIT_PROB, seed=None):
+  """ equivalent of randomize_grid(), returns an (nrows, ncols) uint8 array
+  """
+  rng = numpy.random.RandomState(seed)
+  return (rng.random_sample((nrows, ncols)) < prob).astype(numpy.uint8)
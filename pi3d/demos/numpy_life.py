@@ -0,0 +1,96 @@
+""" Pure NumPy Life engine, no GPU or MPI needed.
+The grid is held as a padded (nrows+2, ncols+2) uint8 array, row j and
+column i of the array matching grid[i][j] of Life.h, so the one cell ghost
+ring plays the same part as the one filled in by copy_bounds(). Each
+generation the ghosts are copied in place, the 3x3 block totals are summed
+as whole array slices (a vertical pass then a horizontal pass) and the rule
+is applied with a lookup table, all into preallocated buffers.
+"""
+import numpy
+
+from life_common import INIT_PROB, read_grid, write_grid, random_cells, rule_table
+
+
+def eval_rows(grid, next_grid, start, stop, rule, vsum, total):
+  """ sum every 3x3 block (centre included) of rows start to stop - 1 of the
+  padded grid and look up their new state in next_grid. vsum and total are
+  work buffers of (stop - start, ncols + 2) and (stop - start, ncols)
+  """
+  numpy.add(grid[start - 1:stop - 1], grid[start:stop], out=vsum)
+  numpy.add(vsum, grid[start + 1:stop + 1], out=vsum)
+  numpy.add(vsum[:, :-2], vsum[:, 1:-1], out=total)
+  numpy.add(total, vsum[:, 2:], out=total)
+  # index into the rule table with 2 * total + centre
+  numpy.left_shift(total, 1, out=total)
+  numpy.add(total, grid[start:stop, 1:-1], out=total)
+  rule.take(total, out=next_grid[start:stop, 1:-1], mode='clip')
+
+
+class NumpyLife(object):
+  def __init__(self, ncols, nrows):
+    self.ncols = ncols
+    self.nrows = nrows
+    self.generation = 0
+    self.grid = numpy.zeros((nrows + 2, ncols + 2), dtype=numpy.uint8)
+    self.next_grid = numpy.zeros_like(self.grid)
+    # work buffers, reused every generation
+    self._vsum = numpy.zeros((nrows, ncols + 2), dtype=numpy.uint8)
+    self._total = numpy.zeros((nrows, ncols), dtype=numpy.uint8)
+    self._rule = rule_table()
+
+  @classmethod
+  def from_file(cls, filename, **kwds):
+    """ load a .in file exactly as init_grids() does """
+    ncols, nrows, cells = read_grid(filename)
+    life = cls(ncols, nrows, **kwds)
+    for i, j in cells:
+      life.grid[j, i] = 1
+    return life
+
+  @classmethod
+  def random(cls, ncols, nrows, prob=INIT_PROB, seed=None, **kwds):
+    """ equivalent of randomize_grid() """
+    life = cls(ncols, nrows, **kwds)
+    life.cells[:] = random_cells(ncols, nrows, prob, seed)
+    return life
+
+  @property
+  def cells(self):
+    """ view of the grid without the ghost ring, indexed [row, column] """
+    return self.grid[1:-1, 1:-1]
+
+  def copy_bounds(self):
+    """ periodic boundaries, sides first then top and bottom including the
+    corners, as copy_bounds() does for a single process
+    """
+    g = self.grid
+    g[1:-1, 0] = g[1:-1, -2]
+    g[1:-1, -1] = g[1:-1, 1]
+    g[0, :] = g[-2, :]
+    g[-1, :] = g[1, :]
+
+  def eval_rules(self):
+    eval_rows(self.grid, self.next_grid, 1, self.nrows + 1, self._rule,
+              self._vsum, self._total)
+
+  def update_grid(self):
+    """ swap the buffers instead of copying next_grid back into grid """
+    self.grid, self.next_grid = self.next_grid, self.grid
+
+  def step(self, generations=1):
+    for _ in range(generations):
+      self.copy_bounds()
+      self.eval_rules()
+      self.update_grid()
+      self.generation += 1
+
+  def population(self):
+    return int(numpy.count_nonzero(self.cells))
+
+  def live_cells(self):
+    """ list of (i, j) in the 1-based numbering used by the .in files """
+    rows, cols = numpy.nonzero(self.cells)
+    return list(zip((cols + 1).tolist(), (rows + 1).tolist()))
+
+  def write(self, filename):
+    write_grid(filename, self.ncols, self.nrows, self.live_cells())
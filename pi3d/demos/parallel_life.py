@@ -0,0 +1,122 @@
+""" Multi-core NumPy Life engine for a single node.
+Both generations of the padded grid live in one anonymous shared mmap,
+and a pool of worker processes, forked once and kept for the whole run,
+each own a horizontal band of rows. A worker reads the rows either side of
+its band straight out of the shared buffer, so no halo is ever copied, and
+fills in the ghost columns of its own rows itself, the first and last
+workers also filling the ghost rows, so the only synchronisation is one
+barrier at the end of every generation.
+"""
+import mmap
+import multiprocessing
+
+import numpy
+
+from life_common import rule_table
+from numpy_life import NumpyLife, eval_rows
+
+
+class Barrier(object):
+  """ reusable barrier for processes (multiprocessing only has one from
+  python 3.3), the two turnstile version from The Little Book of Semaphores
+  """
+  def __init__(self, parties):
+    self.parties = parties
+    self._count = multiprocessing.Value('i', 0)
+    self._turnstile1 = multiprocessing.Semaphore(0)
+    self._turnstile2 = multiprocessing.Semaphore(0)
+
+  def _phase(self, step, last, turnstile):
+    with self._count.get_lock():
+      self._count.value += step
+      if self._count.value == last:
+        for _ in range(self.parties):
+          turnstile.release()
+    turnstile.acquire()
+
+  def wait(self):
+    self._phase(1, self.parties, self._turnstile1)
+    self._phase(-1, 0, self._turnstile2)
+
+
+class ParallelLife(NumpyLife):
+  def __init__(self, ncols, nrows, workers=None):
+    self.ncols = ncols
+    self.nrows = nrows
+    self.generation = 0
+    self.workers = min(workers or multiprocessing.cpu_count(), nrows)
+    size = (nrows + 2) * (ncols + 2)
+    self._shm = mmap.mmap(-1, 2 * size)
+    both = numpy.frombuffer(self._shm, dtype=numpy.uint8)
+    self._buffers = (both[:size].reshape(nrows + 2, ncols + 2),
+                     both[size:].reshape(nrows + 2, ncols + 2))
+    self._rule = rule_table()
+    # first row of every band, and one past the last
+    self.bands = [1 + nrows * w // self.workers for w in range(self.workers + 1)]
+    self._procs = []
+
+  @property
+  def grid(self):
+    return self._buffers[self.generation % 2]
+
+  def _start(self):
+    """ fork the workers, with the command slots they wait on """
+    self._go = [multiprocessing.Semaphore(0) for _ in range(self.workers)]
+    self._done = multiprocessing.Semaphore(0)
+    self._todo = multiprocessing.Value('l', 0, lock=False)
+    self._first = multiprocessing.Value('l', 0, lock=False)
+    self._barrier = Barrier(self.workers)
+    for w in range(self.workers):
+      p = multiprocessing.Process(target=self._work, args=(w,))
+      p.daemon = True
+      p.start()
+      self._procs.append(p)
+
+  def _work(self, w):
+    """ worker loop, steps rows bands[w] to bands[w + 1] - 1 """
+    start, stop = self.bands[w], self.bands[w + 1]
+    ncols, nrows = self.ncols, self.nrows
+    vsum = numpy.zeros((stop - start, ncols + 2), dtype=numpy.uint8)
+    total = numpy.zeros((stop - start, ncols), dtype=numpy.uint8)
+    while True:
+      self._go[w].acquire()
+      todo = self._todo.value
+      if todo < 0:
+        return
+      for g in range(self._first.value, self._first.value + todo):
+        grid, next_grid = self._buffers[g % 2], self._buffers[(g + 1) % 2]
+        eval_rows(grid, next_grid, start, stop, self._rule, vsum, total)
+        next_grid[start:stop, 0] = next_grid[start:stop, ncols]
+        next_grid[start:stop, ncols + 1] = next_grid[start:stop, 1]
+        if start == 1:
+          next_grid[nrows + 1] = next_grid[1]
+        if stop == nrows + 1:
+          next_grid[0] = next_grid[nrows]
+        self._barrier.wait()
+      self._done.release()
+
+  def step(self, generations=1):
+    if generations <= 0:
+      return
+    if not self._procs:
+      self._start()
+    # the workers keep the ghosts up to date from here on, but the cells
+    # may have been edited since the last step
+    self.copy_bounds()
+    self._todo.value = generations
+    self._first.value = self.generation
+    for go in self._go:
+      go.release()
+    for _ in range(self.workers):
+      self._done.acquire()
+    self.generation += generations
+
+  def close(self):
+    """ stop the workers """
+    if self._procs:
+      self._todo.value = -1
+      for go in self._go:
+        go.release()
+      for p in self._procs:
+        p.join()
+      self._procs = []
@@ -0,0 +1,200 @@
+""" Single host stand in for MPI, for developing and benchmarking the
+decomposed engines without mpiexec or a hostfile. The ranks are local
+processes and swap their halos through rings of slots in shared memory,
+signalled with semaphores (futexes on Linux), so nothing goes through the
+network stack. ShmCart answers the calls tile_grid.neighbors() makes of an
+MPI Cartesian communicator and ShmHaloExchange has the interface of
+cart_halo.HaloExchange, so the same decomposition runs on either.
+DecomposedLife splits a headless NumPy world over the ranks this way, to
+check a decomposition against the single process engines.
+"""
+import mmap
+import multiprocessing
+import traceback
+
+import numpy
+
+from numpy_life import NumpyLife, eval_rows
+from life_common import rule_table
+from tile_grid import DIRECTIONS, OPPOSITE, extent, grid_dims, neighbors, strip
+
+
+def _length(s, n):
+  return len(range(*s.indices(n)))
+
+
+class Channel(object):
+  def __init__(self, shape, slots=2):
+    """ ring of slots strips of the given shape in shared memory, from one
+    rank to another. The sender can run slots strips ahead of the receiver
+    before it has to wait. Each end keeps its own place in the ring, so
+    there is nothing to lock
+    """
+    self.slots = slots
+    self._shm = mmap.mmap(-1, slots * int(numpy.prod(shape)))
+    self._ring = numpy.frombuffer(self._shm, dtype=numpy.uint8).reshape(
+        (slots,) + tuple(shape))
+    self._items = multiprocessing.Semaphore(0)
+    self._spaces = multiprocessing.Semaphore(slots)
+    self._head = 0
+    self._tail = 0
+
+  def put(self, strip):
+    self._spaces.acquire()
+    self._ring[self._head] = strip
+    self._head = (self._head + 1) % self.slots
+    self._items.release()
+
+  def get(self, out):
+    self._items.acquire()
+    out[...] = self._ring[self._tail]
+    self._tail = (self._tail + 1) % self.slots
+    self._spaces.release()
+
+
+class ShmCart(object):
+  def __init__(self, size, width, height, depth=1, cell_shape=(), dims=None,
+               slots=2):
+    """ size ranks sharing a periodic width x height world, as a grid of
+    dims (rows, columns) tiles, by default as near square as size allows.
+    Each tile is padded with depth ghost cells and its cells have
+    cell_shape, (3,) say for RGB pixels. The channels are made here, before
+    spawn() forks the ranks
+    """
+    self.size = size
+    self.dims = dims or grid_dims(size)
+    self.rank = 0
+    ny, nx = self.dims
+    if ny * nx != size:
+      raise ValueError('a %d x %d grid needs %d ranks, not %d'
+                       % (ny, nx, ny * nx, size))
+    if width // nx < depth or height // ny < depth:
+      raise ValueError('%d ranks leave tiles smaller than the ghosts' % size)
+    # (y0, y1, x0, x1) of the cells of every rank
+    self.tiles = []
+    # the channel into the ghost cells on side d of rank r
+    self.channels = {}
+    for r in range(size):
+      y, x = self.Get_coords(r)
+      y0, y1 = extent(height, ny, y)
+      x0, x1 = extent(width, nx, x)
+      self.tiles.append((y0, y1, x0, x1))
+      rows, cols = y1 - y0 + 2 * depth, x1 - x0 + 2 * depth
+      for d, (dy, dx) in DIRECTIONS.items():
+        shape = (_length(strip(rows, dy, True, depth), rows),
+                 _length(strip(cols, dx, True, depth), cols)) + tuple(cell_shape)
+        self.channels[r, d] = Channel(shape, slots)
+
+  def Get_rank(self):
+    return self.rank
+
+  def Get_size(self):
+    return self.size
+
+  def Get_coords(self, rank):
+    nx = self.dims[1]
+    return [rank // nx, rank % nx]
+
+  def Get_cart_rank(self, coords):
+    return coords[0] * self.dims[1] + coords[1]
+
+  def spawn(self, target, *args):
+    """ run target(cart, *args) in a new process for every rank, with the
+    rank of the cart set to it, and return the results in rank order
+    """
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=self._run,
+                                     args=(r, target, args, results))
+             for r in range(self.size)]
+    for p in procs:
+      p.start()
+    out = [None] * self.size
+    for _ in procs:
+      rank, value, error = results.get()
+      if error:
+        for p in procs:
+          p.terminate()
+        raise RuntimeError('rank %d failed:\n%s' % (rank, error))
+      out[rank] = value
+    for p in procs:
+      p.join()
+    return out
+
+  def _run(self, rank, target, args, results):
+    self.rank = rank
+    try:
+      results.put((rank, target(self, *args), None))
+    except Exception:
+      results.put((rank, None, traceback.format_exc()))
+
+
+class ShmHaloExchange(object):
+  def __init__(self, cart, grid, depth=1):
+    """ as cart_halo.HaloExchange, for a ShmCart made with the same depth
+    and the cell shape of grid
+    """
+    self.cart = cart
+    self.grid = grid
+    self.depth = depth
+    self.nb = neighbors(cart)
+    rows, cols = grid.shape[:2]
+    self.border = {}
+    self.ghost = {}
+    for d, (dy, dx) in DIRECTIONS.items():
+      self.border[d] = (strip(rows, dy, False, depth),
+                        strip(cols, dx, False, depth))
+      self.ghost[d] = (strip(rows, dy, True, depth),
+                       strip(cols, dx, True, depth))
+
+  def start(self):
+    """ copy the borders into the neighbours' rings, returns the (empty)
+    list of requests to hand to finish()
+    """
+    for d in DIRECTIONS:
+      # what goes towards d lands on the far side of that neighbour
+      self.cart.channels[self.nb[d], OPPOSITE[d]].put(self.grid[self.border[d]])
+    return []
+
+  def finish(self, reqs):
+    """ wait for the neighbours' borders and copy them into the ghosts """
+    for d in DIRECTIONS:
+      self.cart.channels[self.cart.rank, d].get(self.grid[self.ghost[d]])
+
+  def exchange(self):
+    self.finish(self.start())
+
+
+class DecomposedLife(NumpyLife):
+  def __init__(self, ncols, nrows, ranks=None):
+    NumpyLife.__init__(self, ncols, nrows)
+    self.ranks = ranks or multiprocessing.cpu_count()
+    # the world is in shared memory so the ranks can hand their tiles back
+    self._shm = mmap.mmap(-1, (nrows + 2) * (ncols + 2))
+    self.grid = numpy.frombuffer(self._shm, dtype=numpy.uint8).reshape(
+        nrows + 2, ncols + 2)
+
+  def step(self, generations=1):
+    if generations <= 0:
+      return
+    cart = ShmCart(self.ranks, self.ncols, self.nrows)
+    cart.spawn(self._rank, generations)
+    self.generation += generations
+
+  def _rank(self, cart, generations):
+    """ one rank: step its tile with ghosts from the neighbours, then write
+    it back into the shared world. No rank can finish before every rank
+    has read its starting tile, as the first halos come after that
+    """
+    y0, y1, x0, x1 = cart.tiles[cart.rank]
+    grids = [numpy.zeros((y1 - y0 + 2, x1 - x0 + 2), dtype=numpy.uint8)
+             for _ in range(2)]
+    grids[0][1:-1, 1:-1] = self.cells[y0:y1, x0:x1]
+    exchanges = [ShmHaloExchange(cart, grid) for grid in grids]
+    rule = rule_table()
+    vsum = numpy.zeros((y1 - y0, x1 - x0 + 2), dtype=numpy.uint8)
+    total = numpy.zeros((y1 - y0, x1 - x0), dtype=numpy.uint8)
+    for g in range(generations):
+      exchanges[g % 2].exchange()
+      eval_rows(grids[g % 2], grids[(g + 1) % 2], 1, y1 - y0 + 1, rule,
+                vsum, total)
+    self.cells[y0:y1, x0:x1] = grids[generations % 2][1:-1, 1:-1]
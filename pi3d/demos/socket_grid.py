@@ -0,0 +1,259 @@
+""" Halo exchange between the nodes of a periodic ring or 2D grid over plain
+TCP sockets, for running the hybrid Life on clusters without MPI.
+
+The ranks are the lines of a hostfile (a line 'host slots=n' counts n
+times, as for mpiexec) laid out like an MPI Cartesian grid, see
+tile_grid.py. Startup is a rendezvous rather than a retry loop: every rank
+opens its listening socket first, then registers its port with rank 0,
+which listens on a known port. Once every rank has registered rank 0 sends
+out the table of addresses, and as every listener is known to be up by
+then the connections between neighbours succeed first time. Only the
+connection to rank 0 is retried, until rank 0 has started.
+
+There is one connection for each direction a rank sends in, so every
+stream carries a single kind of strip and the messages can't cross, even
+when a neighbour is the same rank on two sides or the rank itself. The
+strips are sent as halo_wire.Frames, run through a halo_codec.HaloCodec
+with compress=True.
+
+AsyncSocketGrid moves all the strips of an exchange at once instead of one
+after the other, see there.
+"""
+import json
+import select
+import socket
+import struct
+import time
+
+from halo_wire import EDGES, Frame
+from tile_grid import DIRECTIONS, OPPOSITE, grid_dims
+
+PORT = 20000
+# rank and listening port sent to rank 0, or rank and direction of a stream
+HELLO = struct.Struct('!II')
+LENGTH = struct.Struct('!I')
+CONNECT_TIMEOUT = 30.0
+
+
+def read_hostfile(filename):
+  """ host of every rank, in rank order """
+  hosts = []
+  for line in open(filename):
+    words = line.split('#')[0].split()
+    if not words:
+      continue
+    slots = 1
+    for word in words[1:]:
+      if word.startswith('slots='):
+        slots = int(word[len('slots='):])
+    hosts.extend([words[0]] * slots)
+  return hosts
+
+
+def _recv_exactly(sock, n):
+  data = b''
+  while len(data) < n:
+    chunk = sock.recv(n - len(data))
+    if not chunk:
+      raise EOFError('connection closed during the rendezvous')
+    data += chunk
+  return data
+
+
+def _connect(address, timeout=0):
+  """ connect to address, trying again every 50 ms for up to timeout
+  seconds while nothing is listening there
+  """
+  deadline = time.time() + timeout
+  while True:
+    try:
+      sock = socket.create_connection(address)
+      break
+    except socket.error:
+      if time.time() > deadline:
+        raise
+      time.sleep(0.05)
+  # halos are small and sent once a generation, don't let Nagle hold them back
+  sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+  return sock
+
+
+class SocketGrid(object):
+  # the directions strips are sent in
+  SIDES = ('l', 'r', 'b', 't')
+
+  def __init__(self, hosts, rank, port=PORT, dims=None, compress=False):
+    """ hosts is the host of every rank, see read_hostfile(). dims is the
+    (rows, columns) of the grid of tiles, (1, len(hosts)) for a ring, by
+    default as near square as the number of ranks allows
+    """
+    self.size = len(hosts)
+    self.compress = compress
+    self.rank = rank
+    self.dims = dims or grid_dims(self.size)
+    ny, nx = self.dims
+    if ny * nx != self.size:
+      raise ValueError('a %d x %d grid needs %d ranks, the hostfile has %d'
+                       % (ny, nx, ny * nx, self.size))
+    self.coords = (rank // nx, rank % nx)
+    y, x = self.coords
+    self.nb = dict((d, (y + dy) % ny * nx + (x + dx) % nx)
+                   for d, (dy, dx) in DIRECTIONS.items())
+    self.generation = 0
+    self._out = {}
+    self._in = {}
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('', port if rank == 0 else 0))
+    listener.listen(max(self.size, 8))
+    table = self._rendezvous(listener, hosts, port)
+
+    # connect to the neighbours first, the listeners queue the connections
+    # so nobody waits for anybody to accept
+    self.send_socks = {}
+    for d in self.SIDES:
+      sock = _connect(tuple(table[self.nb[d]]))
+      sock.sendall(HELLO.pack(rank, EDGES.index(d)))
+      self.send_socks[d] = sock
+    # a strip sent towards d by a neighbour lands in the ghost on side
+    # OPPOSITE[d] of this tile
+    self.recv_socks = {}
+    for _ in self.SIDES:
+      sock, _ = listener.accept()
+      src, d = HELLO.unpack(_recv_exactly(sock, HELLO.size))
+      self.recv_socks[OPPOSITE[EDGES[d]]] = sock
+    listener.close()
+
+  def _rendezvous(self, listener, hosts, port):
+    """ swap listening ports through rank 0, returns the (host, port) of
+    every rank. The hosts are the hostfile's names, not the addresses the
+    connections come from, which are loopback for ranks on rank 0's node
+    """
+    root = hosts[0]
+    if self.rank == 0:
+      table = [None] * self.size
+      table[0] = (root, port)
+      socks = []
+      for _ in range(self.size - 1):
+        sock, _ = listener.accept()
+        r, p = HELLO.unpack(_recv_exactly(sock, HELLO.size))
+        table[r] = (hosts[r], p)
+        socks.append(sock)
+      data = json.dumps(table).encode()
+      for sock in socks:
+        sock.sendall(LENGTH.pack(len(data)) + data)
+        sock.close()
+      return table
+    sock = _connect((root, port), CONNECT_TIMEOUT)
+    sock.sendall(HELLO.pack(self.rank, listener.getsockname()[1]))
+    n, = LENGTH.unpack(_recv_exactly(sock, LENGTH.size))
+    table = json.loads(_recv_exactly(sock, n).decode())
+    sock.close()
+    return table
+
+  def _frame(self, frames, d, shape):
+    if d not in frames:
+      frames[d] = Frame(shape, self.compress)
+    return frames[d]
+
+  def _send(self, d, strip):
+    frame = self._frame(self._out, d, strip.shape)
+    frame.array[...] = strip
+    frame.send(self.send_socks[d], self.generation, d)
+
+  def _recv(self, side, ghost):
+    """ fill ghost, the ghost strip on side side, from the neighbour there """
+    frame = self._frame(self._in, side, ghost.shape)
+    ghost[...] = frame.recv(self.recv_socks[side], self.generation,
+                            OPPOSITE[side])
+
+  def exchange(self, halo):
+    """ swap the border strips of a pi3d.Halo with the neighbours, left and
+    right first so the rows sent up and down carry the corner cells on
+    their ends
+    """
+    edges, ghosts, k = halo.edges, halo.ghosts, halo.depth
+    self._send('r', edges['r'])
+    self._send('l', edges['l'])
+    self._recv('l', ghosts['l'])
+    self._recv('r', ghosts['r'])
+    for d, rows in (('t', slice(-k, None)), ('b', slice(None, k))):
+      frame = self._frame(self._out, d, ghosts[d].shape)
+      frame.array[:, :k] = ghosts['l'][rows]
+      frame.array[:, k:-k] = edges[d]
+      frame.array[:, -k:] = ghosts['r'][rows]
+      frame.send(self.send_socks[d], self.generation, d)
+    self._recv('b', ghosts['b'])
+    self._recv('t', ghosts['t'])
+    self.generation += 1
+
+  def close(self):
+    for sock in list(self.send_socks.values()) + list(self.recv_socks.values()):
+      sock.close()
+
+
+class AsyncSocketGrid(SocketGrid):
+  """ SocketGrid that sends the corner cells straight to the diagonal
+  neighbours, so the sixteen strips of an exchange (eight out, eight in)
+  don't depend on each other, and moves them all at once over non-blocking
+  sockets from a select() loop, the event loop an asyncio transport would
+  run (this tree is Python 2, which has no asyncio). A slow neighbour only
+  holds up its own strips and every ghost strip of the Halo can be used, say
+  uploaded to the GPU, as soon as it is in.
+  """
+  SIDES = tuple(sorted(DIRECTIONS))
+  # the pieces of each ghost strip of a Halo
+  STRIPS = {'l': ('l',), 'r': ('r',), 'b': ('b', 'bl', 'br'),
+            't': ('t', 'tl', 'tr')}
+
+  def __init__(self, hosts, rank, port=PORT, dims=None, compress=False):
+    SocketGrid.__init__(self, hosts, rank, port, dims, compress)
+    for sock in list(self.send_socks.values()) + list(self.recv_socks.values()):
+      sock.setblocking(0)
+
+  def exchange(self, halo, arrived=None):
+    """ swap the border strips of a pi3d.Halo with the neighbours, calling
+    arrived('l'), arrived('b') and so on as each ghost strip is filled in
+    """
+    edges, ghosts, k = halo.edges, halo.ghosts, halo.depth
+    borders = {'l': edges['l'], 'r': edges['r'], 'b': edges['b'],
+               't': edges['t'], 'bl': edges['l'][:k], 'tl': edges['l'][-k:],
+               'br': edges['r'][:k], 'tr': edges['r'][-k:]}
+    targets = {'l': ghosts['l'], 'r': ghosts['r'], 'b': ghosts['b'][:, k:-k],
+               't': ghosts['t'][:, k:-k], 'bl': ghosts['b'][:, :k],
+               'br': ghosts['b'][:, -k:], 'tl': ghosts['t'][:, :k],
+               'tr': ghosts['t'][:, -k:]}
+    # socket -> [message, bytes so far], [side, frame, bytes so far]
+    writing = {}
+    for d, border in borders.items():
+      frame = self._frame(self._out, d, border.shape)
+      frame.array[...] = border
+      writing[self.send_socks[d]] = [frame.pack(self.generation, d), 0]
+    reading = {}
+    for side, ghost in targets.items():
+      frame = self._frame(self._in, side, ghost.shape)
+      reading[self.recv_socks[side]] = [side, frame, 0]
+    missing = dict((s, set(pieces)) for s, pieces in self.STRIPS.items())
+
+    while writing or reading:
+      readable, writable, _ = select.select(list(reading), list(writing), [])
+      for sock in writable:
+        state = writing[sock]
+        state[1] += sock.send(state[0][state[1]:])
+        if state[1] == len(state[0]):
+          del writing[sock]
+      for sock in readable:
+        state = reading[sock]
+        side, frame = state[0], state[1]
+        state[2], done = frame.recv_some(sock, state[2])
+        if not done:
+          continue
+        del reading[sock]
+        targets[side][...] = frame.check(self.generation, OPPOSITE[side])
+        for strip, pieces in missing.items():
+          if side in pieces:
+            pieces.discard(side)
+            if not pieces and arrived:
+              arrived(strip)
+    self.generation += 1
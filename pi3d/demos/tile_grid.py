@@ -0,0 +1,117 @@
+""" Layout of the tiles of a decomposed world, shared by cart_halo.py (over
+MPI), socket_grid.py (over plain sockets) and shm_ranks.py (over shared
+memory), so this module must not need mpi4py. The tiles form a periodic
+grid with rows counting upwards, so 't' is the tile above as in
+get_neighbors.py and in the OpenGL row order. Rank r has tile
+(r // columns, r % columns), as in an MPI Cartesian communicator.
+"""
+
+# (rows, columns) step to the neighbour in each direction
+DIRECTIONS = {'t': (1, 0), 'b': (-1, 0), 'l': (0, -1), 'r': (0, 1),
+              'tl': (1, -1), 'tr': (1, 1), 'bl': (-1, -1), 'br': (-1, 1)}
+OPPOSITE = {'t': 'b', 'b': 't', 'l': 'r', 'r': 'l',
+            'tl': 'br', 'tr': 'bl', 'bl': 'tr', 'br': 'tl'}
+
+
+def grid_dims(n):
+  """ (rows, columns) of the grid of n tiles that is as near square as n
+  allows, the larger first like MPI.Compute_dims
+  """
+  cols = int(n ** 0.5)
+  while n % cols:
+    cols -= 1
+  return n // cols, cols
+
+
+def extent(length, parts, index):
+  """ (start, stop) of part index when length cells are shared out as
+  evenly as possible between parts
+  """
+  return length * index // parts, length * (index + 1) // parts
+
+
+def node_slots(hosts):
+  """ [(host, slots)] of the nodes, in order of first appearance, from the
+  host of every rank as read_hostfile() gives them
+  """
+  nodes = []
+  for host in hosts:
+    if nodes and host in dict(nodes):
+      nodes = [(h, n + (h == host)) for h, n in nodes]
+    else:
+      nodes.append((host, 1))
+  return nodes
+
+
+def _band_order(ny, nx, band):
+  """ tiles (y, x) of a ny x nx grid band rows at a time, snaking along
+  each band column by column, so that runs of consecutive tiles make
+  compact blocks
+  """
+  order = []
+  for b, y0 in enumerate(range(0, ny, band)):
+    rows = list(range(y0, min(y0 + band, ny)))
+    cols = list(range(nx)) if b % 2 == 0 else list(range(nx - 1, -1, -1))
+    for i, x in enumerate(cols):
+      order.extend((y, x) for y in (rows if i % 2 == 0 else rows[::-1]))
+  return order
+
+
+def cut_sides(owner, dims):
+  """ number of pairs of side by side tiles on different nodes, owner
+  being the node of every rank
+  """
+  ny, nx = dims
+  return sum(owner[y * nx + x] != owner[(y + dy) % ny * nx + (x + dx) % nx]
+             for y in range(ny) for x in range(nx)
+             for dy, dx in ((0, 1), (1, 0)))
+
+
+def place_ranks(nodes, dims):
+  """ host of every rank of a dims grid of tiles, given the (host, slots)
+  of the nodes, so that most neighbouring tiles share a node and their
+  halos never reach the network. The tiles are dealt out to the nodes in
+  bands of rows (or of columns) snaking across the grid, with whichever
+  band width leaves the fewest neighbouring tiles on different nodes
+  """
+  ny, nx = dims
+  hosts = [host for host, slots in nodes for _ in range(slots)]
+  if len(hosts) < ny * nx:
+    raise ValueError('%d tiles need placing but the nodes have %d slots'
+                     % (ny * nx, len(hosts)))
+  best = None
+  for transpose in (False, True):
+    for band in range(1, (nx if transpose else ny) + 1):
+      if transpose:
+        order = [(y, x) for x, y in _band_order(nx, ny, band)]
+      else:
+        order = _band_order(ny, nx, band)
+      owner = [None] * (ny * nx)
+      for (y, x), host in zip(order, hosts):
+        owner[y * nx + x] = host
+      cut = cut_sides(owner, dims)
+      if best is None or cut < best[0]:
+        best = (cut, owner)
+  return best[1]
+
+
+def neighbors(cart):
+  """ dict of the ranks of the eight neighbouring tiles, keyed as in
+  get_neighbors.py. cart is an MPI Cartesian communicator or anything with
+  its dims, Get_rank(), Get_coords() and Get_cart_rank()
+  """
+  ny, nx = cart.dims
+  y, x = cart.Get_coords(cart.Get_rank())
+  return dict((d, cart.Get_cart_rank([(y + dy) % ny, (x + dx) % nx]))
+              for d, (dy, dx) in DIRECTIONS.items())
+
+
+def strip(n, step, ghost, depth=1):
+  """ rows (or columns) of a padded axis of length n on side step of it,
+  the ghosts or the border cells next to them
+  """
+  if step == 0:
+    return slice(depth, n - depth)
+  if step < 0:
+    return slice(0, depth) if ghost else slice(depth, 2 * depth)
+  return slice(n - depth, n) if ghost else slice(n - 2 * depth, n - depth)
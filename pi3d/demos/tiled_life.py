@@ -0,0 +1,118 @@
+""" NumPy Life engine that skips the quiet parts of the world.
+The world is cut into tiles (32x32 cells by default) and only the active
+tiles are worked out each generation, so once a soup has settled the cost
+of a generation follows the activity rather than the area. Active tiles are
+gathered with their one cell border into a single batch, stepped together
+and scattered into the other buffer. When most tiles are active the whole
+grid is stepped in one go instead, which is cheaper than the gather.
+
+The two buffers hold generations t and t-1, and a tile is left alone when
+none of the cells in it or its eight neighbour tiles differ between t and
+t-2: its next state is then its state at t-1, which the buffer being written
+already holds. That covers still lifes and also the blinkers, toads and
+beacons that make up most of the ash of a random soup, which would keep
+their tiles busy forever if only the last generation's changes counted.
+
+The grid is rounded up to whole tiles, the spare cells past the edge of the
+world are kept as wrapped copies of the first rows and columns (with the
+usual ghost ring) by copy_bounds(), which keeps the boundaries periodic.
+"""
+import numpy
+from numpy.lib.stride_tricks import as_strided
+
+from life_common import rule_table
+from numpy_life import NumpyLife
+
+DEFAULT_TILE = 32
+# above this fraction of active tiles step the whole grid instead
+DENSE_FRACTION = 0.5
+
+
+class TiledLife(NumpyLife):
+  def __init__(self, ncols, nrows, tile=DEFAULT_TILE):
+    self.ncols = ncols
+    self.nrows = nrows
+    self.tile = tile
+    self.generation = 0
+    self.ntx = -(-ncols // tile)
+    self.nty = -(-nrows // tile)
+    width, height = self.ntx * tile, self.nty * tile
+    self.grid = numpy.zeros((height + 2, width + 2), dtype=numpy.uint8)
+    self.next_grid = numpy.zeros_like(self.grid)
+    # work buffers for stepping the whole grid
+    self._vsum = numpy.zeros((height, width + 2), dtype=numpy.uint8)
+    self._total = numpy.zeros((height, width), dtype=numpy.uint8)
+    self._new = numpy.zeros((height, width), dtype=numpy.uint8)
+    self._rule = rule_table()
+    # sources of the spare columns and rows, wrapped round the world
+    self._col_src = (numpy.arange(ncols + 1, width + 2) - 1) % ncols + 1
+    self._row_src = (numpy.arange(nrows + 1, height + 2) - 1) % nrows + 1
+    self.active = numpy.ones((self.nty, self.ntx), dtype=bool)
+    self.active_fractions = []
+
+  @property
+  def cells(self):
+    return self.grid[1:self.nrows + 1, 1:self.ncols + 1]
+
+  def _windows(self, grid):
+    """ (nty, ntx, tile + 2, tile + 2) view of every tile with its border """
+    t = self.tile
+    s0, s1 = grid.strides
+    return as_strided(grid, (self.nty, self.ntx, t + 2, t + 2),
+                      (t * s0, t * s1, s0, s1))
+
+  def _tiles(self, grid):
+    """ (nty, ntx, tile, tile) view of every tile """
+    t = self.tile
+    s0, s1 = grid.strides
+    return as_strided(grid[1:, 1:], (self.nty, self.ntx, t, t),
+                      (t * s0, t * s1, s0, s1))
+
+  def copy_bounds(self):
+    """ periodic boundaries, filling the spare cells as well as the ghosts """
+    g = self.grid
+    nrows, ncols = self.nrows, self.ncols
+    g[1:nrows + 1, ncols + 1:] = g[1:nrows + 1, self._col_src]
+    g[1:nrows + 1, 0] = g[1:nrows + 1, ncols]
+    g[nrows + 1:, :] = g[self._row_src, :]
+    g[0, :] = g[nrows, :]
+
+  def eval_rules(self):
+    """ step the active tiles into next_grid and work out which tiles will
+    be active next generation
+    """
+    if self.generation == 0:
+      # nothing is known about t-1 yet, so start both buffers equal
+      self.next_grid[:] = self.grid
+    ty, tx = numpy.nonzero(self.active)
+    fraction = len(ty) / float(self.active.size)
+    self.active_fractions.append(fraction)
+    changed = numpy.zeros_like(self.active)
+    if fraction > DENSE_FRACTION:
+      g = self.grid
+      vsum, total, new = self._vsum, self._total, self._new
+      numpy.add(g[:-2], g[1:-1], out=vsum)
+      numpy.add(vsum, g[2:], out=vsum)
+      numpy.add(vsum[:, :-2], vsum[:, 1:-1], out=total)
+      numpy.add(total, vsum[:, 2:], out=total)
+      numpy.left_shift(total, 1, out=total)
+      numpy.add(total, g[1:-1, 1:-1], out=total)
+      self._rule.take(total, out=new, mode='clip')
+      old = self.next_grid[1:-1, 1:-1]
+      t = self.tile
+      changed[:] = (new != old).reshape(self.nty, t, self.ntx, t).any(axis=(1, 3))
+      old[:] = new
+    elif len(ty):
+      batch = self._windows(self.grid)[ty, tx]
+      vsum = batch[:, :-2] + batch[:, 1:-1] + batch[:, 2:]
+      total = vsum[:, :, :-2] + vsum[:, :, 1:-1] + vsum[:, :, 2:]
+      # index into the rule table with 2 * total + centre
+      total <<= 1
+      total += batch[:, 1:-1, 1:-1]
+      new = self._rule.take(total)
+      tiles = self._tiles(self.next_grid)
+      changed[ty, tx] = (new != tiles[ty, tx]).any(axis=(1, 2))
+      tiles[ty, tx] = new
+    # a change can reach the eight tiles round it, wrapping at the edges
+    active = changed | numpy.roll(changed, 1, 0) | numpy.roll(changed, -1, 0)
+    self.active = active | numpy.roll(active, 1, 1) | numpy.roll(active, -1, 1)
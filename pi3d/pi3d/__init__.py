@@ -52,5 +52,10 @@ from pi3d.util.String import String
 
 from pi3d.util.Defocus import Defocus
 from pi3d.util.Font import Font
+from pi3d.util.Halo import Halo
+from pi3d.util.PingPong import PingPong
+from pi3d.util.PixelBuffer import PixelBuffer
+from pi3d.util.RenderTexture import RenderTexture
 from pi3d.util.Screenshot import screenshot
+from pi3d.util.TiledPingPong import TiledPingPong
 from pi3d.util.Ttffont import Ttffont
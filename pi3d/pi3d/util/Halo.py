@@ -0,0 +1,68 @@
+from pi3d.constants import *
+from pi3d.util.PixelBuffer import PixelBuffer
+
+class Halo(object):
+  """Border strips of a w x h framebuffer whose outer ring of pixels, *depth*
+  deep, are ghost cells belonging to the neighbouring tiles. read() fetches
+  only the ring inside that (the cells the neighbours need) and upload()
+  copies the framebuffer into a texture on the GPU then writes the ghost
+  ring over it with glTexSubImage2D(), so the interior never leaves the GPU
+  and the traffic each generation is proportional to the perimeter, not the
+  area.
+
+  *edges* and *ghosts* are dicts of numpy views keyed 'l', 'r', 'b' and 't'.
+  With d the depth the left and right strips are (h - 2d, d, channels) and
+  cover the rows between the ghost rows. The bottom and top edges are
+  (d, w - 2d, channels) but the ghost rows are (d, w, channels), corners
+  included, so filling the ghost columns first then sending rows with them
+  on the ends passes the corner cells on without any diagonal messages.
+  """
+  def __init__(self, w, h, channels=3, depth=1):
+    self.w = w
+    self.h = h
+    self.channels = channels
+    self.depth = d = depth
+    self._edges = {'l': PixelBuffer(d, h - 2 * d, channels),
+                   'r': PixelBuffer(d, h - 2 * d, channels),
+                   'b': PixelBuffer(w - 2 * d, d, channels),
+                   't': PixelBuffer(w - 2 * d, d, channels)}
+    self._ghosts = {'l': PixelBuffer(d, h - 2 * d, channels),
+                    'r': PixelBuffer(d, h - 2 * d, channels),
+                    'b': PixelBuffer(w, d, channels),
+                    't': PixelBuffer(w, d, channels)}
+    # bottom left pixel of every strip
+    self._edge_at = {'l': (d, d), 'r': (w - 2 * d, d), 'b': (d, d),
+                     't': (d, h - 2 * d)}
+    self._ghost_at = {'l': (0, d), 'r': (w - d, d), 'b': (0, 0), 't': (0, h - d)}
+    self.edges = dict((k, b.array) for k, b in self._edges.items())
+    self.ghosts = dict((k, b.array) for k, b in self._ghosts.items())
+
+  def read(self):
+    """fetch the four edge strips from the framebuffer"""
+    for k, buf in self._edges.items():
+      buf.read(*self._edge_at[k])
+    return self.edges
+
+  def copy(self, texture):
+    """copy the framebuffer into *texture* on the GPU. OpenGL only queues
+    the copy, so it can run while the ghosts are being exchanged
+    """
+    tex = getattr(texture, '_tex', texture)
+    opengles.glBindTexture(GL_TEXTURE_2D, tex)
+    fmt = GL_RGBA if self.channels == 4 else GL_RGB
+    opengles.glCopyTexImage2D(GL_TEXTURE_2D, 0, fmt, 0, 0, self.w, self.h, 0)
+
+  def upload_ghost(self, texture, side):
+    """write the ghost strip on *side* ('l', 'r', 'b' or 't') into *texture*"""
+    tex = getattr(texture, '_tex', texture)
+    self._ghosts[side].upload_sub(tex, *self._ghost_at[side])
+
+  def upload_ghosts(self, texture):
+    """write the ghost ring into *texture*"""
+    for side in self._ghosts:
+      self.upload_ghost(texture, side)
+
+  def upload(self, texture):
+    """copy the framebuffer into *texture* and overwrite its ghost ring"""
+    self.copy(texture)
+    self.upload_ghosts(texture)
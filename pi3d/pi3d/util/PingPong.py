@@ -0,0 +1,54 @@
+from pi3d.util.RenderTexture import RenderTexture
+
+class PingPong(object):
+  """Two RenderTextures taking turns, for shaders like conway that work out
+  the next state of an image from the last one. Each step draws *shape*
+  with the current texture into the other texture and swaps them, so the
+  state stays on the GPU from one step to the next and only comes back to
+  the CPU when read() is called.
+  """
+  def __init__(self, w, h, shape, shader, seed):
+    """
+    Arguments:
+      *w*, *h*
+        size in pixels, the same as the display so the shape covers it
+        one pixel to one texel
+      *shape*
+        Shape covering the display, usually a Sprite
+      *shader*
+        Shader that works out the next state
+      *seed*
+        Texture drawn from by the first step
+    """
+    self.shape = shape
+    self.shader = shader
+    self.targets = [RenderTexture(w, h), RenderTexture(w, h)]
+    self.current = seed
+    self._next = 0
+    self.generation = 0
+
+  def step(self, generations=1):
+    """draw the next *generations* states, ping-ponging between targets"""
+    for _ in range(generations):
+      target = self.targets[self._next]
+      target.start()
+      self.shape.draw(self.shader, [self.current])
+      target.end()
+      self.current = target
+      self._next = 1 - self._next
+      self.generation += 1
+
+  def draw(self, shader):
+    """draw the current state with *shader*, to the display unless some
+    other framebuffer is bound
+    """
+    self.shape.draw(shader, [self.current])
+
+  def read(self, pixels, x=0, y=0):
+    """read the current state into the PixelBuffer *pixels*, after at least
+    one step()
+    """
+    self.current.start()
+    pixels.read(x, y)
+    self.current.end()
+    return pixels.array
@@ -0,0 +1,54 @@
+import ctypes
+import numpy
+
+from pi3d.constants import *
+
+class PixelBuffer(object):
+  """A block of pixels that can be read back from the framebuffer, worked on
+  with numpy and sent back to a texture without being copied. One ctypes
+  array is allocated up front and *array* is a (h, w, channels) uint8 numpy
+  view of the same memory, so glReadPixels() writes straight into the array
+  and glTexImage2D() reads straight out of it. Rows run bottom to top, the
+  order OpenGL uses.
+  """
+  def __init__(self, w, h, channels=3):
+    """
+    Arguments:
+      *w*, *h*
+        size in pixels
+      *channels*
+        3 for GL_RGB, 4 for GL_RGBA
+    """
+    self.w = w
+    self.h = h
+    self.format = GL_RGBA if channels == 4 else GL_RGB
+    self.buf = (ctypes.c_ubyte * (w * h * channels))()
+    self.array = numpy.ctypeslib.as_array(self.buf).reshape(h, w, channels)
+
+  def read(self, x=0, y=0):
+    """fill the buffer from the framebuffer, starting at pixel (x, y)"""
+    # rows are packed with no padding so they line up with the numpy view
+    opengles.glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    opengles.glReadPixels(x, y, self.w, self.h, self.format, GL_UNSIGNED_BYTE,
+                          ctypes.byref(self.buf))
+    return self.array
+
+  def upload(self, texture):
+    """replace the image of *texture* (a Texture or a texture id) with the
+    contents of the buffer
+    """
+    tex = getattr(texture, '_tex', texture)
+    opengles.glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    opengles.glBindTexture(GL_TEXTURE_2D, tex)
+    opengles.glTexImage2D(GL_TEXTURE_2D, 0, self.format, self.w, self.h, 0,
+                          self.format, GL_UNSIGNED_BYTE, self.buf)
+
+  def upload_sub(self, texture, x, y):
+    """write the buffer into part of the existing image of *texture*, with
+    its bottom left pixel at (x, y)
+    """
+    tex = getattr(texture, '_tex', texture)
+    opengles.glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    opengles.glBindTexture(GL_TEXTURE_2D, tex)
+    opengles.glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, self.w, self.h,
+                             self.format, GL_UNSIGNED_BYTE, self.buf)
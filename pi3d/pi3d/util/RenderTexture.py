@@ -0,0 +1,54 @@
+import ctypes
+import Image
+
+from pi3d.constants import *
+from pi3d.Texture import Texture
+
+class RenderTexture(Texture):
+  """A w x h texture that can be drawn into instead of the display, through
+  its own framebuffer object, the way Defocus captures a scene. Nothing is
+  copied through the CPU, so the result of one draw can be used as the
+  texture of the next.
+  """
+  def __init__(self, w, h):
+    """ calls Texture.__init__ but doesn't need to set file name as the
+    image is generated by drawing into it
+    """
+    super(RenderTexture, self).__init__("render_texture", mipmap=False)
+    self.ix, self.iy = w, h
+    self.im = Image.new("RGB", (w, h))
+    self.image = self.im.tostring('raw', "RGB")
+    self.alpha = False
+    self.blend = False
+
+    self._tex = ctypes.c_int()
+    self.framebuffer = (ctypes.c_int * 1)()
+    opengles.glGenFramebuffers(1, self.framebuffer)
+
+  def _load_disk(self):
+    """ have to override this
+    """
+
+  def _load_opengl(self):
+    """ as Texture, wrapping round at the edges, unless a size is not a
+    power of 2, when it has to be clamped there instead
+    """
+    super(RenderTexture, self)._load_opengl()
+    if self.ix & (self.ix - 1) or self.iy & (self.iy - 1):
+      opengles.glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+      opengles.glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+  def start(self):
+    """ after calling this method all object.draw()s go into this texture
+    and not onto the display, until end() is called. glReadPixels() reads
+    from the texture in between
+    """
+    self.load_opengl()
+    opengles.glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer[0])
+    opengles.glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0,
+                GL_TEXTURE_2D, self._tex.value, 0)
+
+  def end(self):
+    """ stop drawing to the texture and resume normal rendering to default
+    """
+    opengles.glBindFramebuffer(GL_FRAMEBUFFER, 0)
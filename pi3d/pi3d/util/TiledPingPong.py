@@ -0,0 +1,125 @@
+import numpy
+
+from pi3d.constants import *
+from pi3d.util.PixelBuffer import PixelBuffer
+from pi3d.util.RenderTexture import RenderTexture
+
+MAX_TILE = 2046 # so a tile and its ghost ring fit in a 2048 texture
+
+class _Tile(object):
+  """one texture sized piece of the world, w x h cells in a pair of
+  (w + 2) x (h + 2) RenderTextures, the outer ring being ghost cells
+  """
+  def __init__(self, x, y, w, h):
+    self.x, self.y, self.w, self.h = x, y, w, h
+    self.targets = [RenderTexture(w + 2, h + 2), RenderTexture(w + 2, h + 2)]
+    for target in self.targets:
+      target.load_opengl()
+    self.current = self.targets[0]
+    self.pixels = None
+
+
+class TiledPingPong(object):
+  """PingPong for worlds of any width x height, bigger than one texture can
+  hold. The world is split into a grid of tiles of at most *tile* cells a
+  side, each ping-ponging between its own pair of RenderTextures with a one
+  cell ghost ring round it. After every step the ghost rings are filled in
+  from the neighbouring tiles with glCopyTexSubImage2D(), left and right
+  columns first then whole rows, ghosts included, above and below so that
+  the corners come along with them. The world wraps round at its edges and
+  never leaves the GPU between steps.
+
+  The shader sees the texture size in unif[15] (see set_2d_size()) and must
+  address texels exactly, as shaders/conway_tile does. World arrays for
+  write() and read() are (h, w, 3) uint8, rows running bottom to top as
+  OpenGL has them.
+  """
+  def __init__(self, w, h, shape, shader, tile=MAX_TILE):
+    """
+    Arguments:
+      *w*, *h*
+        size of the world in cells
+      *shape*
+        Shape that covers the viewport, usually a Sprite
+      *shader*
+        Shader that works out the next state
+      *tile*
+        longest side of a tile in cells
+    """
+    from pi3d.Display import Display
+    self.w = w
+    self.h = h
+    self.shape = shape
+    self.shader = shader
+    self.display = Display.INSTANCE
+    self.generation = 0
+    self.nx = -(-w // tile)
+    self.ny = -(-h // tile)
+    # even split, so there are no slivers at the right and top
+    xs = [w * k // self.nx for k in range(self.nx + 1)]
+    ys = [h * k // self.ny for k in range(self.ny + 1)]
+    self.tiles = [[_Tile(xs[i], ys[j], xs[i + 1] - xs[i], ys[j + 1] - ys[j])
+                   for i in range(self.nx)] for j in range(self.ny)]
+
+  def _neighbour(self, i, j, di, dj):
+    return self.tiles[(j + dj) % self.ny][(i + di) % self.nx]
+
+  def write(self, world):
+    """upload a (h, w, 3) array as the current state"""
+    for j, row in enumerate(self.tiles):
+      for i, t in enumerate(row):
+        ys = numpy.arange(t.y - 1, t.y + t.h + 1) % self.h
+        xs = numpy.arange(t.x - 1, t.x + t.w + 1) % self.w
+        pixels = PixelBuffer(t.w + 2, t.h + 2)
+        pixels.array[:] = world[ys[:, None], xs]
+        pixels.upload(t.current)
+
+  def step(self, generations=1):
+    """work out the next *generations* states of every tile"""
+    for _ in range(generations):
+      for row in self.tiles:
+        for t in row:
+          target = t.targets[1] if t.current is t.targets[0] else t.targets[0]
+          target.start()
+          opengles.glViewport(0, 0, t.w + 2, t.h + 2)
+          self.shape.set_2d_size(t.w + 2, t.h + 2, 0.0, 0.0)
+          self.shape.draw(self.shader, [t.current])
+          target.end()
+          t.current = target
+      self._fill_ghosts()
+      self.generation += 1
+    opengles.glViewport(0, 0, self.display.width, self.display.height)
+
+  def _copy(self, src, dst, sx, sy, dx, dy, w, h):
+    """copy a w x h block from the current texture of tile src at (sx, sy)
+    to the current texture of tile dst at (dx, dy)
+    """
+    src.current.start()
+    opengles.glBindTexture(GL_TEXTURE_2D, dst.current._tex)
+    opengles.glCopyTexSubImage2D(GL_TEXTURE_2D, 0, dx, dy, sx, sy, w, h)
+    src.current.end()
+
+  def _fill_ghosts(self):
+    for j, row in enumerate(self.tiles):
+      for i, t in enumerate(row):
+        west, east = self._neighbour(i, j, -1, 0), self._neighbour(i, j, 1, 0)
+        self._copy(west, t, west.w, 1, 0, 1, 1, t.h)
+        self._copy(east, t, 1, 1, t.w + 1, 1, 1, t.h)
+    for j, row in enumerate(self.tiles):
+      for i, t in enumerate(row):
+        south, north = self._neighbour(i, j, 0, -1), self._neighbour(i, j, 0, 1)
+        self._copy(south, t, 0, south.h, 0, 0, t.w + 2, 1)
+        self._copy(north, t, 0, 1, 0, t.h + 1, t.w + 2, 1)
+
+  def read(self):
+    """(h, w, 3) array of the current state of the whole world"""
+    world = numpy.zeros((self.h, self.w, 3), dtype=numpy.uint8)
+    for row in self.tiles:
+      for t in row:
+        if t.pixels is None:
+          t.pixels = PixelBuffer(t.w, t.h)
+        t.current.start()
+        t.pixels.read(1, 1)
+        t.current.end()
+        world[t.y:t.y + t.h, t.x:t.x + t.w] = t.pixels.array
+    return world
@@ -0,0 +1,13 @@
+precision highp float;
+
+uniform sampler2D tex0;
+uniform vec3 unif[16];
+//uniform vec3(w, h, full_h) => unif[15]
+
+varying vec2 pix_inv;
+
+// copies the texture to the screen one texel to one pixel, to show a state
+// worked out off screen by conway without stepping it again
+void main(void) {
+  gl_FragColor = texture2D(tex0, vec2(gl_FragCoord) * pix_inv);
+}
@@ -0,0 +1,25 @@
+precision highp float;
+
+uniform sampler2D tex0;
+uniform vec3 unif[16];
+//uniform vec3(w, h, full_h) => unif[15]
+
+varying vec2 pix_inv;
+
+// conway for one tile of a TiledPingPong world, the same rules as conway.fs
+// but addressing texels exactly (the texture is the size of the viewport)
+// so the ghost ring round the tile lines up cell for cell
+void main(void) {
+  vec2 coord = vec2(gl_FragCoord); //pixel position, texel centre
+  float ntot = 0.0; //total score of 3x3 grid of pixels
+  for (float i=-1.0; i < 2.0; i+=1.0) {
+    for (float j=-1.0; j < 2.0; j+=1.0) {
+      ntot += step(0.25, texture2D(tex0, (coord + vec2(i, j)) * pix_inv).b); //add 1.0 if blue > 0.25
+    }
+  }
+  vec4 texc = texture2D(tex0, coord * pix_inv); //current value of pixel
+  ntot -= step(0.25, texc.b); // take away this square (centre of grid)
+  if (ntot == 3.0) texc = vec4(0.0, 0.0, 1.0, 1.0);
+  else if (ntot != 2.0) texc = vec4(smoothstep(0.0, 5.0, ntot), 1.0, 0.0, 0.0);
+  gl_FragColor = texc;
+}
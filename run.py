@@ -1,25 +1,155 @@
 #!/usr/bin/python
+import os
+import socket
 import sys
 import subprocess
 
+LOCAL = ('localhost', '127.0.0.1', socket.gethostname())
+
+def sweep(cmd, flag, values, seconds, name):
+	""" run cmd once with flag set to each of values, ghost depths say, and
+	print a table of the times, seconds picks the time out of the output of
+	a run """
+	print name + "\ttime"
+	for value in values:
+		out = subprocess.check_output(cmd + [flag, value])
+		print value + "\t" + str(seconds(out))
+
+def c_seconds(out):
+	# every rank prints its time on a line of its own, among warnings and
+	# rebalancing logs, the slowest sets the pace
+	times = []
+	for line in out.splitlines():
+		try:
+			times.append(float(line))
+		except ValueError:
+			pass
+	return max(times)
+
+def hybrid_seconds(out):
+	# every rank prints its time, the slowest sets the pace
+	return max(float(line.split(':')[1]) for line in out.splitlines()
+			if line.startswith('Time for'))
+
+def place(hostfile, dims):
+	""" host of every rank of a dims grid of tiles, neighbouring tiles on one
+	node wherever the slots of the hostfile allow, see tile_grid.place_ranks() """
+	from socket_grid import read_hostfile
+	from tile_grid import cut_sides, node_slots, place_ranks
+	hosts = read_hostfile(hostfile)
+	placed = place_ranks(node_slots(hosts), dims)
+	sides = 2 * dims[0] * dims[1]
+	print "%d of %d tile sides cross between nodes (%d in hostfile order)" % (
+		cut_sides(placed, dims), sides, cut_sides(hosts[:len(placed)], dims))
+	return placed
+
+def placed_hostfile(hostfile, hosts):
+	""" write a hostfile with one line for every rank, the host of rank r on
+	line r, returns its name """
+	name = hostfile + '.placed'
+	with open(name, 'w') as f:
+		f.write('\n'.join(hosts) + '\n')
+	return name
+
+def mpiexec_placed(hostfile, dims):
+	""" mpiexec options starting rank r on the host place() picked for it. The
+	sequential mapper starts one rank for every line of a placed hostfile, and
+	unlike a rankfile doesn't bind the ranks to cores """
+	# the mapper only knows this host by its own name
+	hosts = [socket.gethostname() if host in LOCAL else host
+			for host in place(hostfile, dims)]
+	return ['--hostfile', placed_hostfile(hostfile, hosts), '--map-by', 'seq',
+			'-n', str(len(hosts))]
+
+def launch_ranks(hostfile, args, hosts):
+	""" start one socket_conway.py for every rank, rank r on hosts[r], over ssh
+	for the ranks on other hosts, and wait for them all """
+	# socket_conway.py finds the other ranks in the hostfile, so it gets one
+	# listing them in rank order
+	placed = placed_hostfile(hostfile, hosts)
+	procs = []
+	for rank, host in enumerate(hosts):
+		cmd = ['python', './pi3d/demos/socket_conway.py', placed, str(rank)] + args
+		if host not in LOCAL:
+			cmd = ['ssh', host, 'cd ' + os.getcwd() + ' && ' + ' '.join(cmd)]
+		procs.append(subprocess.Popen(cmd))
+	for p in procs:
+		p.wait()
+
 sim = ''
 hostfile = ''
 length = 0
 iter = 0
 
-if len(sys.argv) != 5:
-	print "usage: run.py simname hostfile length num_evolutions"
+if len(sys.argv) < 5:
+	print "usage: run.py simname hostfile length num_evolutions [options]"
 else:
 	sim = sys.argv[1]
 	hostfile = sys.argv[2]
 	length = sys.argv[3]
 	itr = sys.argv[4]
+	# anything after num_evolutions is handed on to the simulation
+	options = sys.argv[5:]
+	# --depth-sweep 1,2,4,8 runs cmpi or hybridmpi once for every ghost depth
+	depths = None
+	if '--depth-sweep' in options:
+		i = options.index('--depth-sweep')
+		depths = options[i + 1].split(',')
+		options = options[:i] + options[i + 2:]
+	# --thread-sweep 1,2,4 runs cmpi once for every number of OpenMP threads
+	threads = None
+	if '--thread-sweep' in options:
+		i = options.index('--thread-sweep')
+		threads = options[i + 1].split(',')
+		options = options[:i] + options[i + 2:]
+	# --kernel-sweep runs cmpi once with each neighbour counting kernel
+	kernels = '--kernel-sweep' in options
+	if kernels:
+		options.remove('--kernel-sweep')
+	# --by-slot leaves placing the ranks to mpiexec, filling each node in turn
+	by_slot = '--by-slot' in options
+	if by_slot:
+		options.remove('--by-slot')
+	sys.path.insert(0, './pi3d/demos')
+	from socket_grid import read_hostfile
+	from tile_grid import grid_dims
+	mpiexec = ['mpiexec']
+	if by_slot:
+		mpiexec += ['--hostfile', hostfile]
 	#print sim + hostfile + str(length) + str(itr) 
 	
 	if sys.argv[1] == 'cmpi':
-		subprocess.call(['mpiexec', '--hostfile', hostfile, './C_MPI_Implementation/Life', '-c', length, '-r', length, '-g', itr])
+		# the C engine splits the world into a ring of column strips, or with
+		# --blocks a 2D grid of blocks laid out as MPI_Dims_create does
+		if not by_slot:
+			size = len(read_hostfile(hostfile))
+			blocks = '-b' in options or '--blocks' in options
+			mpiexec += mpiexec_placed(hostfile, grid_dims(size) if blocks else (1, size))
+		cmd = mpiexec + ['./C_MPI_Implementation/Life', '-c', length, '-r', length, '-g', itr] + options
+		if depths:
+			sweep(cmd, '-D', depths, c_seconds, 'depth')
+		elif kernels:
+			sweep(cmd, '-K', ['rules', 'sums'], c_seconds, 'kernel')
+		elif threads:
+			sweep(cmd, '-j', threads, c_seconds, 'threads')
+		else:
+			subprocess.call(cmd)
 	elif sys.argv[1] == 'serial':
-		subprocess.call(['python', './pi3d/demos/Conway.py', length, itr])
+		subprocess.call(['python', './pi3d/demos/Conway.py', length, itr] + options)
 	elif sys.argv[1] == 'hybridmpi':
-		subprocess.call(['mpiexec', '--hostfile', hostfile, 'python', './pi3d/demos/MPIConway.py', length, itr])
+		if not by_slot:
+			mpiexec += mpiexec_placed(hostfile, grid_dims(len(read_hostfile(hostfile))))
+		cmd = mpiexec + ['python', './pi3d/demos/MPIConway.py', length, itr] + options
+		if depths:
+			sweep(cmd, '--depth', depths, hybrid_seconds, 'depth')
+		else:
+			subprocess.call(cmd)
+	elif sys.argv[1] in ('numpy', 'bitpacked', 'hashlife', 'tiled', 'parallel', 'ranks'):
+		subprocess.call(['python', './pi3d/demos/HeadlessConway.py', sim, length, itr] + options)
+	elif sys.argv[1] == 'socket':
+		hosts = read_hostfile(hostfile)
+		if not by_slot:
+			size = len(hosts)
+			hosts = place(hostfile, (1, size) if '--ring' in options else grid_dims(size))
+		launch_ranks(hostfile, [length, itr] + options, hosts)
 	